@@ -1,5 +1,13 @@
 import unittest
 from mn_puzzle import MNPuzzle
+from puzzle_tools import breadth_first_solve, astar_solve, ida_star_solve
+from puzzle_tools import bidirectional_solve, depth_first_solve
+from puzzle_tools import SolverContext
+from pattern_database import build_pattern_database, load_pattern_database
+from pattern_database import default_groups
+import os
+import pickle
+import tempfile
 
 class TestExtension(unittest.TestCase):
 
@@ -23,5 +31,146 @@ class TestExtension(unittest.TestCase):
         act = MNPuzzle(self.p1, self.p1).is_solved()
         self.assertEqual(ans, act)
 
+    def test_state_key(self):
+        exts = MNPuzzle(self.p1, self.p1).extensions()
+        keys = {i.state_key() for i in exts}
+        self.assertEqual(keys, {sum(i, ()) for i in self.fs})
+        self.assertEqual(len(set(exts)), 2)
+        self.assertEqual(hash(exts[0]), hash(MNPuzzle(self.p2, self.p1)))
+
+    def test_astar(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        self.assertEqual(path_length(astar_solve(MNPuzzle(start, target))),
+                         31)
+        start = (("4", "1", "3"), ("7", "2", "6"), ("*", "5", "8"))
+        self.assertEqual(
+            path_length(astar_solve(MNPuzzle(start, target))),
+            path_length(breadth_first_solve(MNPuzzle(start, target))))
+
+    def test_ida_star(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        self.assertEqual(
+            path_length(ida_star_solve(MNPuzzle(start, target))), 31)
+
+    def test_bidirectional(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        node = bidirectional_solve(MNPuzzle(start, target))
+        self.assertEqual(node.puzzle, MNPuzzle(start, target))
+        self.assertEqual(path_length(node), 31)
+        while node.children:
+            self.assertIn(node.children[0].puzzle, node.puzzle.extensions())
+            node = node.children[0]
+        self.assertTrue(node.puzzle.is_solved())
+
+    def test_heuristic(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        self.assertEqual(MNPuzzle(start, target).manhattan_distance(), 21)
+        self.assertLessEqual(MNPuzzle(start, target).heuristic(), 31)
+        self.assertEqual(MNPuzzle(target, target).heuristic(), 0)
+
+    def test_fail_fast(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        self.assertFalse(MNPuzzle(start, target).fail_fast())
+        swapped = (("6", "8", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        self.assertTrue(MNPuzzle(swapped, target).fail_fast())
+        for solve in (breadth_first_solve, depth_first_solve, astar_solve,
+                      ida_star_solve, bidirectional_solve):
+            context = SolverContext()
+            self.assertIsNone(solve(MNPuzzle(swapped, target),
+                                    context=context))
+            self.assertEqual(context.expanded, 0)
+        for x in MNPuzzle(start, target).extensions():
+            self.assertFalse(x.fail_fast())
+
+    def test_pattern_database(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        path = os.path.join(tempfile.mkdtemp(), "eight.pdb")
+        build_pattern_database(target, default_groups(sum(target, ()), 4),
+                               path)
+        db = load_pattern_database(path)
+        p = MNPuzzle(start, target, db)
+        self.assertGreaterEqual(p.heuristic(), p.manhattan_distance())
+        self.assertEqual(path_length(ida_star_solve(p)), 31)
+        self.assertEqual(path_length(astar_solve(p)), 31)
+        copy = pickle.loads(pickle.dumps(db))
+        for x in p.extensions():
+            self.assertLessEqual(x.heuristic(), 32)
+            self.assertGreaterEqual(x.heuristic(),
+                                    copy.estimate(x.state_key()))
+        copy.close()
+        self.assertEqual(MNPuzzle(target, target, db).heuristic(), 0)
+        with self.assertRaises(ValueError):
+            MNPuzzle(start, start, db)
+        db.close()
+
+    def test_small_groups(self):
+        target = (("1", "2", "3"), ("4", "5", "*"))
+        start = (("*", "5", "4"), ("3", "2", "1"))
+        path = os.path.join(tempfile.mkdtemp(), "one.pdb")
+        build_pattern_database(target, [("1",)], path)
+        db = load_pattern_database(path)
+        p = MNPuzzle(start, target, db)
+        self.assertLess(db.estimate(p.state_key()), p.manhattan_distance())
+        self.assertEqual(p.heuristic(),
+                         MNPuzzle(start, target).heuristic())
+        db.close()
+
+    def test_not_a_database(self):
+        path = os.path.join(tempfile.mkdtemp(), "bad.pdb")
+        for data in (b"", b"abc", b"x" * 100):
+            with open(path, "wb") as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                load_pattern_database(path)
+
+    def test_compact(self):
+        target = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        start = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
+        solution = ida_star_solve(MNPuzzle(start, target), compact=True)
+        self.assertEqual(len(solution), 31)
+        self.assertTrue(all(isinstance(i, int) for i in solution.moves))
+        self.assertTrue(solution.final().is_solved())
+        self.assertEqual(path_length(solution.to_node()), 31)
+        with self.assertRaises(ValueError):
+            MNPuzzle(start, target).apply_move(0)
+
+    def test_blank(self):
+        start = (("1", "2", "3"), ("4", "*", "5"), ("6", "7", "8"))
+        exts = MNPuzzle(start, start).extensions()
+        self.assertEqual([x.state_key().index("*") for x in exts],
+                         [1, 7, 3, 5])
+        for x in exts:
+            self.assertEqual(x._blank, x.state_key().index("*"))
+            self.assertIn(MNPuzzle(start, start), x.extensions())
+            self.assertIn(x, {x.goal(): 0, x: 1})
+
+    def test_budgets(self):
+        target = (("1", "2", "3", "4"), ("5", "6", "7", "8"),
+                  ("9", "10", "11", "12"), ("13", "14", "15", "*"))
+        start = (("*", "15", "14", "13"), ("12", "11", "10", "9"),
+                 ("8", "7", "6", "5"), ("4", "3", "2", "1"))
+        for solve in (depth_first_solve, breadth_first_solve):
+            act = solve(MNPuzzle(start, target), max_visited=5000)
+            # at most one expansion past the limit
+            self.assertLessEqual(act.visited, 5000 + 4)
+            # a timeout of 0 has run out before the first expansion
+            act = solve(MNPuzzle(start, target), timeout=0)
+            self.assertEqual((act.reason, act.expanded), ("time", 0))
+
+
+def path_length(node):
+    length = 0
+    while node.children:
+        node = node.children[0]
+        length += 1
+    return length
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
-from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle, _Board
+from puzzle_tools import depth_first_solve
+import pickle
 
 class test_extension(unittest.TestCase):
     case1 =GridPegSolitairePuzzle([
@@ -55,6 +57,64 @@ class test_extension(unittest.TestCase):
         self.assertEqual(self.com(self.case3.extensions()), self.com(self.ans3), "You should not move to #")
         self.assertEqual(self.com(self.case4.extensions()), self.com(self.ans4))
 
+    def test_jump_to_edge(self):
+        case = GridPegSolitairePuzzle([['.', '*', '*']], {'*', '#', '.'})
+        exp = GridPegSolitairePuzzle([['*', '.', '.']], {'*', '#', '.'})
+        self.assertEqual(case.extensions(), [exp])
+        case = GridPegSolitairePuzzle([['.'], ['*'], ['*']], {'*', '#', '.'})
+        exp = GridPegSolitairePuzzle([['*'], ['.'], ['.']], {'*', '#', '.'})
+        self.assertEqual(case.extensions(), [exp])
+
+    def test_marker_view(self):
+        for puzzle, ans in [(self.case1, self.ans1), (self.case2, self.ans2)]:
+            for act, exp in zip(puzzle.extensions(), ans):
+                self.assertEqual(act, exp)
+                self.assertEqual(act._marker, exp._marker)
+                self.assertEqual(hash(act), hash(exp))
+
+    def test_symmetric_keys(self):
+        keys = {i.state_key() for i in self.case1.extensions()}
+        self.assertEqual(len(keys), 2)
+        rotated = GridPegSolitairePuzzle(
+            [list(row) for row in zip(*self.case2._marker)], {'*', '#', '.'})
+        self.assertNotEqual(rotated, self.case2)
+        self.assertEqual(rotated.state_key(), self.case2.state_key())
+        self.assertEqual(self.case3.state_key(),
+                         GridPegSolitairePuzzle([row[::-1] for row in self.case3._marker],
+                                                {'*', '#', '.'}).state_key())
+
+    def test_asymmetric_board(self):
+        case = GridPegSolitairePuzzle([['#', '*', '*'], ['*', '.', '*']],
+                                      {'*', '#', '.'})
+        flipped = GridPegSolitairePuzzle([['*', '*', '#'], ['*', '.', '*']],
+                                         {'*', '#', '.'})
+        self.assertEqual(case._board.symmetries, [])
+        self.assertNotEqual(case.state_key(), flipped.state_key())
+
+    def test_compact(self):
+        solution = depth_first_solve(self.case1, compact=True)
+        self.assertEqual(len(solution), 23)
+        copy = pickle.loads(pickle.dumps(solution))
+        self.assertEqual(copy, solution)
+        puzzles = list(copy.puzzles())
+        for x, y in zip(puzzles, puzzles[1:]):
+            self.assertIn(y, x.extensions())
+        self.assertTrue(puzzles[-1].is_solved())
+
+    def test_equal_boards(self):
+        # threads missing the board cache together each build a _Board
+        grid = [["*", "*", "*"], ["*", ".", "*"], ["#", "*", "*"]]
+        p1 = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        p2 = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        board = p1._board
+        p2._board = _Board(board.m, board.n, board.unused)
+        self.assertIsNot(p1._board, p2._board)
+        self.assertEqual(p1, p2)
+        self.assertEqual(hash(p1._board), hash(p2._board))
+        grid[2][0] = "*"
+        self.assertNotEqual(GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+                            ._board, board)
+
     def test_is_solved(self):
         self.assertEqual(self.case4.is_solved(), True)
         self.assertEqual(self.case3.is_solved(), False)
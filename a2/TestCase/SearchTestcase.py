@@ -2,7 +2,15 @@ from __future__ import annotations
 import unittest
 from typing import *
 from puzzle import Puzzle
-from puzzle_tools import depth_first_solve, breadth_first_solve
+from puzzle_tools import depth_first_solve, breadth_first_solve, SolverContext
+from puzzle_tools import astar_solve, ida_star_solve, bidirectional_solve
+from puzzle_tools import MoveSequence, replay, parallel_solve, solve_many
+from puzzle_tools import solve_many_async
+from puzzle_tools import async_solve, BudgetExceeded, TimedContext
+from itertools import count
+import asyncio
+from time import sleep, monotonic
+from threading import Thread
 class GraphPuzzle(Puzzle):
     map: Dict[int: List[int]]
     cur: int
@@ -26,6 +34,59 @@ class GraphPuzzle(Puzzle):
         return self.map == other.map and self.cur == other.cur and self.to == other.to
 
 
+class LinePuzzle(Puzzle):
+    cur: int
+    to: int
+    def __init__(self, i, t):
+        self.cur = i
+        self.to = t
+
+    def extensions(self) -> List[Puzzle]:
+        return [LinePuzzle(self.cur + 1, self.to)] if self.cur < self.to else []
+
+    def state_key(self):
+        return self.cur
+
+    def is_solved(self) -> bool:
+        return self.cur == self.to
+
+
+class DeadEndPuzzle(LinePuzzle):
+    def extensions(self) -> List[Puzzle]:
+        return [DeadEndPuzzle(self.cur + 1, self.to)] if self.cur < self.to else []
+
+    def fail_fast(self) -> bool:
+        return self.cur > 0
+
+
+class ForkPuzzle(Puzzle):
+    """Two ways from 0: one reaches 3, the other goes down forever."""
+    def __init__(self, cur, down_first):
+        self.cur = cur
+        self.down_first = down_first
+
+    def extensions(self) -> List[Puzzle]:
+        if self.cur == 0:
+            steps = [-1, 1] if self.down_first else [1, -1]
+        else:
+            steps = [-1] if self.cur < 0 else [1]
+        return [ForkPuzzle(self.cur + i, self.down_first) for i in steps]
+
+    def state_key(self):
+        return self.cur
+
+    def is_solved(self) -> bool:
+        return self.cur == 3
+
+
+def deadline_after(n):
+    """Return a callback that makes the deadline pass after n expansions."""
+    def callback(context, puzzle):
+        if context.expanded == n:
+            context.deadline = monotonic()
+    return callback
+
+
 class TestSolver(unittest.TestCase):
     t1 = {1: [2], 2: [3, 4], 3: [4], 4: [5]}
     t2 = {1: [2]}
@@ -57,6 +118,12 @@ GraphPuzzle(5, {1: [2], 2: [3, 4], 3: [4], 4: [5]}, 5)
 """
         act2 = str(breadth_first_solve(GraphPuzzle(1, self.t1, 5)))
         self.assertEqual(exp2, act2, "You should return the shortest path")
+        act3 = str(astar_solve(GraphPuzzle(1, self.t1, 5)))
+        self.assertEqual(exp2, act3, "You should return the shortest path")
+        act4 = str(ida_star_solve(GraphPuzzle(1, self.t1, 5)))
+        self.assertEqual(exp2, act4, "You should return the shortest path")
+        act5 = str(bidirectional_solve(GraphPuzzle(1, self.t1, 5)))
+        self.assertEqual(exp2, act5, "You should return the shortest path")
 
     def test_no_solution(self):
         exp = None
@@ -67,6 +134,9 @@ GraphPuzzle(5, {1: [2], 2: [3, 4], 3: [4], 4: [5]}, 5)
         act = breadth_first_solve(GraphPuzzle(1, self.t2, 5))
         self.assertEqual(exp, act)
 
+        act = astar_solve(GraphPuzzle(1, self.t2, 5))
+        self.assertEqual(exp, act)
+
     def test_check_seen(self):
         exp = None
         act = depth_first_solve(GraphPuzzle(1, self.t3, 5))
@@ -75,6 +145,264 @@ GraphPuzzle(5, {1: [2], 2: [3, 4], 3: [4], 4: [5]}, 5)
         exp = None
         act = breadth_first_solve(GraphPuzzle(1, self.t3, 5))
         self.assertEqual(exp, act)
+
+        act = ida_star_solve(GraphPuzzle(1, self.t3, 5))
+        self.assertEqual(exp, act)
+
+    def test_back_to_back(self):
+        for solver in [depth_first_solve, breadth_first_solve]:
+            first = str(solver(GraphPuzzle(1, self.t1, 5)))
+            self.assertEqual(first, str(solver(GraphPuzzle(1, self.t1, 5))))
+
+    def test_threads(self):
+        graph = {i: [i + 1, i + 2] for i in range(100)}
+        results = {}
+
+        def run(name, solver):
+            results[name] = str(solver(GraphPuzzle(0, graph, 100)))
+        threads = [Thread(target=run, args=(i, solver))
+                   for i, solver in enumerate([depth_first_solve,
+                                               breadth_first_solve] * 4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(set(results[i] for i in range(0, 8, 2))), 1)
+        self.assertEqual(len(set(results[i] for i in range(1, 8, 2))), 1)
+
+    def test_long_path(self):
+        node = depth_first_solve(LinePuzzle(0, 20000))
+        length = 1
+        while node.children:
+            self.assertIs(node.children[0].parent, node)
+            node = node.children[0]
+            length += 1
+        self.assertEqual(length, 20001)
+        self.assertEqual(node.puzzle.cur, 20000)
+
+    def test_context(self):
+        context = SolverContext()
+        depth_first_solve(GraphPuzzle(1, self.t3, 5), context)
+        self.assertEqual(len(context.visited), 3)
+        self.assertEqual(context.expanded, 3)
+        context = SolverContext(max_expansions=1)
+        act = breadth_first_solve(GraphPuzzle(1, self.t1, 5), context)
+        self.assertIsInstance(act, BudgetExceeded)
+        self.assertTrue(context.cut_off)
+
+    def test_compact(self):
+        for solve in (depth_first_solve, breadth_first_solve, astar_solve,
+                      ida_star_solve, bidirectional_solve):
+            exp = solve(GraphPuzzle(1, self.t1, 5))
+            act = solve(GraphPuzzle(1, self.t1, 5), compact=True)
+            self.assertIsInstance(act, MoveSequence)
+            self.assertEqual(str(act.to_node()), str(exp))
+            self.assertEqual(act.final(), GraphPuzzle(5, self.t1, 5))
+        act = breadth_first_solve(GraphPuzzle(1, self.t1, 5), compact=True)
+        self.assertEqual(act.moves, [0, 1, 0])
+        self.assertEqual(len(act), 3)
+        self.assertEqual(breadth_first_solve(GraphPuzzle(5, self.t1, 5),
+                                             compact=True).moves, [])
+        self.assertIsNone(breadth_first_solve(GraphPuzzle(1, self.t2, 5),
+                                              compact=True))
+        with self.assertRaises(ValueError):
+            list(replay(GraphPuzzle(1, self.t1, 5), [0, 2]))
+
+    def test_parallel(self):
+        for solve in (depth_first_solve, breadth_first_solve, astar_solve):
+            act = parallel_solve(GraphPuzzle(1, self.t1, 5), solve,
+                                 workers=2, deterministic=True)
+            self.assertEqual(str(act), str(solve(GraphPuzzle(1, self.t1, 5))))
+        # splitting past the goal finds it while splitting
+        act = parallel_solve(GraphPuzzle(1, self.t1, 5), split_depth=5,
+                             workers=2, compact=True)
+        self.assertEqual(act.moves, [0, 1, 0])
+        self.assertIsNone(parallel_solve(GraphPuzzle(1, self.t3, 5),
+                                         workers=2))
+        context = SolverContext()
+        act = parallel_solve(GraphPuzzle(1, self.t1, 5), workers=2,
+                             context=context, compact=True)
+        self.assertEqual(act.final(), GraphPuzzle(5, self.t1, 5))
+        self.assertGreater(context.expanded, 1)
+
+    def test_parallel_stops(self):
+        # the part going down never ends unless it is stopped
+        for down_first in (True, False):
+            act = parallel_solve(ForkPuzzle(0, down_first), workers=2,
+                                 compact=True)
+            self.assertEqual(act.moves, [int(down_first), 0, 0])
+        act = parallel_solve(ForkPuzzle(0, False), workers=2,
+                             deterministic=True, compact=True)
+        self.assertEqual(len(act), 3)
+
+    def test_solve_many(self):
+        puzzles = [GraphPuzzle(1, self.t1, 5), GraphPuzzle(1, self.t3, 5),
+                   ForkPuzzle(0, False)]
+        act = sorted(solve_many(puzzles, breadth_first_solve, workers=2),
+                     key=lambda x: x.index)
+        self.assertEqual([x.index for x in act], [0, 1, 2])
+        self.assertEqual(str(act[0].solution),
+                         str(breadth_first_solve(puzzles[0])))
+        self.assertIsNone(act[1].solution)
+        self.assertFalse(act[1].cut_off)
+        self.assertEqual(act[2].solution.children[0].puzzle.cur, 1)
+
+    def test_solve_many_budgets(self):
+        # depth-first search from ForkPuzzle(0, True) goes down forever
+        act = list(solve_many([ForkPuzzle(0, True)] * 2, workers=2,
+                              max_expansions=100))
+        self.assertEqual([x.expanded for x in act], [100, 100])
+        self.assertTrue(all(x.cut_off and x.solution is None for x in act))
+        act = list(solve_many([ForkPuzzle(0, True)], workers=1,
+                              timeout=0))
+        self.assertTrue(act[0].cut_off and act[0].solution is None)
+        self.assertEqual(act[0].expanded, 0)
+
+    def test_solve_many_endless(self):
+        puzzles = (GraphPuzzle(1, self.t1, 5) for _ in count())
+        results = solve_many(puzzles, workers=2, compact=True)
+        for _ in range(5):
+            self.assertEqual(len(next(results).solution), 4)
+        results.close()
+
+    def test_async(self):
+        for solve in (depth_first_solve, breadth_first_solve):
+            act = asyncio.run(async_solve(GraphPuzzle(1, self.t1, 5), solve,
+                                          every=1))
+            self.assertEqual(str(act), str(solve(GraphPuzzle(1, self.t1, 5))))
+        self.assertIsNone(asyncio.run(async_solve(GraphPuzzle(1, self.t3, 5))))
+        with self.assertRaises(ValueError):
+            asyncio.run(async_solve(GraphPuzzle(1, self.t1, 5), astar_solve))
+
+    def test_async_timeout(self):
+        # depth-first search from ForkPuzzle(0, True) goes down forever
+        context = SolverContext(callback=deadline_after(30))
+        act = asyncio.run(async_solve(ForkPuzzle(0, True), every=7,
+                                      context=context))
+        self.assertEqual((act.reason, act.expanded), ("time", 30))
+        self.assertTrue(context.cut_off)
+        act = asyncio.run(async_solve(ForkPuzzle(0, True), timeout=0))
+        self.assertEqual((act.reason, act.expanded), ("time", 0))
+
+    def test_async_cancel(self):
+        ticks, context = [], SolverContext()
+
+        async def tick():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            ticker = asyncio.create_task(tick())
+            try:
+                await asyncio.wait_for(async_solve(
+                    ForkPuzzle(0, True), context=context), 0.2)
+            finally:
+                ticker.cancel()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(main())
+        self.assertTrue(context.cut_off)
+        self.assertGreater(context.expanded, 0)
+        self.assertGreater(len(ticks), 5)
+
+    def test_budgets(self):
+        # ForkPuzzle(4, True) goes up forever, past 3
+        for solve in (depth_first_solve, breadth_first_solve):
+            act = solve(ForkPuzzle(4, True), max_expansions=50)
+            self.assertEqual((act.reason, act.expanded), ("expansions", 50))
+            act = solve(ForkPuzzle(4, True), max_visited=20)
+            self.assertEqual(act.reason, "visited")
+            self.assertLessEqual(act.visited, 21)
+            act = solve(ForkPuzzle(4, True), timeout=0)
+            self.assertEqual((act.reason, act.expanded), ("time", 0))
+            act = solve(ForkPuzzle(4, True),
+                        context=SolverContext(callback=deadline_after(30)))
+            self.assertEqual((act.reason, act.expanded), ("time", 30))
+            # budgets that are not reached change nothing
+            self.assertEqual(str(solve(GraphPuzzle(1, self.t1, 5),
+                                       max_expansions=10, timeout=10,
+                                       max_visited=10)),
+                             str(solve(GraphPuzzle(1, self.t1, 5))))
+            self.assertIsNone(solve(GraphPuzzle(1, self.t3, 5),
+                                    max_expansions=10))
+
+    def test_stats(self):
+        seen = []
+        context = SolverContext(callback=lambda c, x: seen.append(x.cur))
+        breadth_first_solve(GraphPuzzle(1, self.t1, 5), context)
+        self.assertEqual(seen, [1, 2, 3, 4])
+        self.assertEqual(context.duplicates, 1)
+        self.assertEqual(context.max_frontier, 2)
+        self.assertGreater(context.visited_bytes(), 0)
+        self.assertEqual(context.stats()["branching"], 5 / 4)
+        # 2 leads back to 1, so every solver meets a state again
+        graph = {1: [2], 2: [1, 3, 4], 3: [4], 4: [5]}
+        for solve in (depth_first_solve, breadth_first_solve, astar_solve,
+                      ida_star_solve, bidirectional_solve):
+            context = TimedContext()
+            self.assertEqual(str(solve(GraphPuzzle(1, graph, 5),
+                                       context=context)),
+                             str(solve(GraphPuzzle(1, graph, 5))))
+            stats = context.stats(True)
+            self.assertEqual(stats["visited_bytes"], context.visited_bytes())
+            self.assertGreater(stats["extensions_time"], 0)
+            self.assertGreater(stats["is_solved_time"], 0)
+            self.assertGreater(stats["hashing_time"], 0)
+            self.assertGreater(stats["duplicates"], 0)
+            self.assertGreater(stats["max_frontier"], 0)
+        # the callback is not timed as generating extensions
+        context = TimedContext(callback=lambda c, x: sleep(0.05))
+        breadth_first_solve(GraphPuzzle(1, self.t1, 5), context)
+        self.assertLess(context.extensions_time, 0.05)
+
+    def test_solve_many_async(self):
+        puzzles = [GraphPuzzle(1, self.t1, 5), GraphPuzzle(1, self.t3, 5),
+                   ForkPuzzle(0, True)]
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            ticker = asyncio.create_task(tick())
+            results = [x async for x in solve_many_async(
+                puzzles, breadth_first_solve, workers=2, max_expansions=50)]
+            # an endless stream, left after three results
+            endless = solve_many_async(
+                (GraphPuzzle(1, self.t1, 5) for _ in count()), workers=2,
+                compact=True)
+            lengths = []
+            async for result in endless:
+                lengths.append(len(result.solution))
+                if len(lengths) == 3:
+                    break
+            await endless.aclose()
+            ticker.cancel()
+            return results, lengths
+
+        results, lengths = asyncio.run(main())
+        results.sort(key=lambda x: x.index)
+        self.assertEqual(str(results[0].solution),
+                         str(breadth_first_solve(puzzles[0])))
+        self.assertIsNone(results[1].solution)
+        self.assertFalse(results[1].cut_off)
+        self.assertEqual(results[2].solution.children[0].puzzle.cur, 1)
+        self.assertEqual(lengths, [4, 4, 4])
+        self.assertGreater(len(ticks), 0)
+
+    def test_prune(self):
+        context = SolverContext()
+        self.assertIsNone(depth_first_solve(DeadEndPuzzle(0, 5), context))
+        self.assertEqual(context.generated, 1)
+        self.assertEqual(context.pruned, 1)
+        self.assertEqual(context.expanded, 1)
+        for solve in (breadth_first_solve, astar_solve, ida_star_solve):
+            self.assertIsNone(solve(DeadEndPuzzle(0, 5)))
+
+
 if __name__ == "__main__":
     unittest.main()
 
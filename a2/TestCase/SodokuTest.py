@@ -1,5 +1,7 @@
 import unittest
-from sudoku_puzzle import SudokuPuzzle
+from sudoku_puzzle import SudokuPuzzle, exact_cover_solve, _SymbolTable
+from puzzle_tools import depth_first_solve, MoveSequence
+import pickle
 
 class TestFailFasr(unittest.TestCase):
 
@@ -36,3 +38,108 @@ class TestFailFasr(unittest.TestCase):
         self.assertEqual(p3.fail_fast(), True)
         self.assertEqual(p4.fail_fast(), False)
 
+    def test_extensions_propagate(self):
+        p = SudokuPuzzle(4, [["1", "2", "*", "*"],
+                             ["*", "*", "*", "*"],
+                             ["*", "*", "*", "*"],
+                             ["*", "*", "*", "*"]], self.symbol_set)
+        for x in p.extensions():
+            self.assertEqual(x._symbols[0][:2], ["1", "2"])
+            self.assertNotIn("*", x._symbols[0])
+        p = SudokuPuzzle(4, [["1", "*", "*", "*"],
+                             ["*", "*", "2", "*"],
+                             ["*", "*", "*", "*"],
+                             ["*", "*", "*", "*"]], self.symbol_set)
+        for x in p.extensions():
+            self.assertFalse(x.fail_fast())
+
+
+class TestSolve(unittest.TestCase):
+    grid = ["8********", "**36*****", "*7**9*2**", "*5***7***",
+            "****457**", "***1***3*", "**1****68", "**85***1*",
+            "*9****4**"]
+
+    def test_hard(self):
+        symbols = [list(row) for row in self.grid]
+        node = depth_first_solve(SudokuPuzzle(9, symbols, set("123456789")))
+        while node.children:
+            node = node.children[0]
+        self.assertTrue(node.puzzle.is_solved())
+        for r in range(9):
+            for c in range(9):
+                if self.grid[r][c] != "*":
+                    self.assertEqual(node.puzzle._symbols[r][c],
+                                     self.grid[r][c])
+
+    def test_mrv(self):
+        symbols = [list(row) for row in self.grid]
+        p = SudokuPuzzle(9, symbols, set("123456789"), mrv=True)
+        counts = [bin(p._allowed(r, c)).count("1")
+                  for r in range(9) for c in range(9) if symbols[r][c] == "*"]
+        r, c = p._branch_position()
+        self.assertEqual(bin(p._allowed(r, c)).count("1"), min(counts))
+        for x in p.extensions():
+            self.assertEqual(x._symbols[r][c] == "*", False)
+            self.assertTrue(x._mrv)
+        node = depth_first_solve(p)
+        while node.children:
+            node = node.children[0]
+        self.assertTrue(node.puzzle.is_solved())
+
+    def test_compact(self):
+        symbols = [list(row) for row in self.grid]
+        p = SudokuPuzzle(9, symbols, set("123456789"))
+        solution = depth_first_solve(p, compact=True)
+        self.assertEqual(solution.start, p)
+        self.assertEqual(solution.final(), p.solution())
+        for move in solution.moves:
+            self.assertEqual(len(move), 3)
+        self.assertEqual(pickle.loads(pickle.dumps(solution)), solution)
+
+    def test_equal_tables(self):
+        # threads missing the table cache together each build a table
+        symbols = [list(row) for row in self.grid]
+        s1 = SudokuPuzzle(9, symbols, set("123456789"))
+        s2 = SudokuPuzzle(9, symbols, set("123456789"))
+        s2._table = _SymbolTable(s1._table.symbol_set, frozenset())
+        self.assertIsNot(s1._table, s2._table)
+        self.assertEqual(s1, s2)
+        self.assertEqual(hash(s1._table), hash(s2._table))
+        self.assertNotEqual(_SymbolTable(frozenset("12"), frozenset("3")),
+                            _SymbolTable(frozenset("123"), frozenset()))
+
+    def test_slots(self):
+        s = SudokuPuzzle(9, [list(row) for row in self.grid],
+                         set("123456789"))
+        self.assertFalse(hasattr(s, "__dict__"))
+        with self.assertRaises(AttributeError):
+            s.foo = 1
+        for x in s.extensions():
+            self.assertFalse(hasattr(x, "__dict__"))
+
+    def test_solution(self):
+        symbols = [list(row) for row in self.grid]
+        solved = SudokuPuzzle(9, symbols, set("123456789")).solution()
+        self.assertTrue(solved.is_solved())
+        start = SudokuPuzzle(9, symbols, set("123456789"))
+        node, moves = exact_cover_solve(start), []
+        while node.children:
+            self.assertIs(node.children[0].parent, node)
+            self.assertIn(node.children[0].puzzle, node.puzzle.extensions())
+            moves.append(node.puzzle.move_to(node.children[0].puzzle))
+            node = node.children[0]
+        self.assertEqual(node.puzzle, solved)
+        self.assertEqual(MoveSequence(start, moves).final(), solved)
+
+    def test_solution_16(self):
+        symbols = [[format((4 * (r % 4) + r // 4 + c) % 16, "x")
+                    for c in range(16)] for r in range(16)]
+        for r in range(16):
+            for c in range(16):
+                if (r * 7 + c * 3) % 5 < 3:
+                    symbols[r][c] = "*"
+        p = SudokuPuzzle(16, symbols, set("0123456789abcdef"))
+        self.assertTrue(p.solution().is_solved())
+        symbols[0][0] = symbols[0][1] = "1"
+        self.assertIsNone(SudokuPuzzle(16, symbols,
+                                       set("0123456789abcdef")).solution())
@@ -1,5 +1,10 @@
 import unittest
 from word_ladder_puzzle import WordLadderPuzzle
+from word_ladder_puzzle import compile_word_set, load_word_set
+from puzzle_tools import breadth_first_solve, bidirectional_solve
+import os
+import pickle
+import tempfile
 
 class WordTest(unittest.TestCase):
     words = {'aaaa', 'aaab', 'aaac', 'aaad', 'aaba', 'aabb', 'aabc', 'aabd', 'aaca', 'aacb', 'aacc', 'aacd', 'aada', 'aadb', 'aadc', 'aadd', 'abaa', 'abab', 'abac', 'abad', 'abba', 'abbb', 'abbc', 'abbd', 'abca', 'abcb', 'abcc', 'abcd', 'abda', 'abdb', 'abdc', 'abdd', 'acaa', 'acab', 'acac', 'acad', 'acba', 'acbb', 'acbc', 'acbd', 'acca', 'accb', 'accc', 'accd', 'acda', 'acdb', 'acdc', 'acdd', 'adaa', 'adab', 'adac', 'adad', 'adba', 'adbb', 'adbc', 'adbd', 'adca', 'adcb', 'adcc', 'adcd', 'adda', 'addb', 'addc', 'addd', 'baaa', 'baab', 'baac', 'baad', 'baba', 'babb', 'babc', 'babd', 'baca', 'bacb', 'bacc', 'bacd', 'bada', 'badb', 'badc', 'badd', 'bbaa', 'bbab', 'bbac', 'bbad', 'bbba', 'bbbb', 'bbbc', 'bbbd', 'bbca', 'bbcb', 'bbcc', 'bbcd', 'bbda', 'bbdb', 'bbdc', 'bbdd', 'bcaa', 'bcab', 'bcac', 'bcad', 'bcba', 'bcbb', 'bcbc', 'bcbd', 'bcca', 'bccb', 'bccc', 'bccd', 'bcda', 'bcdb', 'bcdc', 'bcdd', 'bdaa', 'bdab', 'bdac', 'bdad', 'bdba', 'bdbb', 'bdbc', 'bdbd', 'bdca', 'bdcb', 'bdcc', 'bdcd', 'bdda', 'bddb', 'bddc', 'bddd', 'caaa', 'caab', 'caac', 'caad', 'caba', 'cabb', 'cabc', 'cabd', 'caca', 'cacb', 'cacc', 'cacd', 'cada', 'cadb', 'cadc', 'cadd', 'cbaa', 'cbab', 'cbac', 'cbad', 'cbba', 'cbbb', 'cbbc', 'cbbd', 'cbca', 'cbcb', 'cbcc', 'cbcd', 'cbda', 'cbdb', 'cbdc', 'cbdd', 'ccaa', 'ccab', 'ccac', 'ccad', 'ccba', 'ccbb', 'ccbc', 'ccbd', 'ccca', 'cccb', 'cccc', 'cccd', 'ccda', 'ccdb', 'ccdc', 'ccdd', 'cdaa', 'cdab', 'cdac', 'cdad', 'cdba', 'cdbb', 'cdbc', 'cdbd', 'cdca', 'cdcb', 'cdcc', 'cdcd', 'cdda', 'cddb', 'cddc', 'cddd', 'daaa', 'daab', 'daac', 'daad', 'daba', 'dabb', 'dabc', 'dabd', 'daca', 'dacb', 'dacc', 'dacd', 'dada', 'dadb', 'dadc', 'dadd', 'dbaa', 'dbab', 'dbac', 'dbad', 'dbba', 'dbbb', 'dbbc', 'dbbd', 'dbca', 'dbcb', 'dbcc', 'dbcd', 'dbda', 'dbdb', 'dbdc', 'dbdd', 'dcaa', 'dcab', 'dcac', 'dcad', 'dcba', 'dcbb', 'dcbc', 'dcbd', 'dcca', 'dccb', 'dccc', 'dccd', 'dcda', 'dcdb', 'dcdc', 'dcdd', 'ddaa', 'ddab', 'ddac', 'ddad', 'ddba', 'ddbb', 'ddbc', 'ddbd', 'ddca', 'ddcb', 'ddcc', 'ddcd', 'ddda', 'dddb', 'dddc', 'dddd'}
@@ -12,6 +17,88 @@ class WordTest(unittest.TestCase):
         act1 = WordLadderPuzzle('aaaa', 'abcd', self.words).extensions()
         self.assertEqual(self.com(ans1), self.com(act1))
 
+    def test_extension_order(self):
+        words = {'cart', 'dart', 'cars', 'card', 'bard', 'bark', 'Cart',
+                 'c-rt', 'carts'}
+        act = WordLadderPuzzle('cart', 'bark', words).extensions()
+        self.assertEqual([str(i) for i in act],
+                         ['dart -> bark', 'card -> bark', 'cars -> bark'])
+        words.add('cort')
+        act = WordLadderPuzzle('cart', 'bark', words).extensions()
+        self.assertEqual(len(act), 4)
+
+    def test_word_set_changes(self):
+        # same size, different words
+        ws = {'cost', 'cast', 'most'}
+        before = WordLadderPuzzle('cost', 'case', ws)
+        self.assertEqual(self.com(before.extensions()),
+                         {'cast -> case', 'most -> case'})
+        ws.discard('most')
+        ws.add('case')
+        act = WordLadderPuzzle('cost', 'case', ws).extensions()
+        self.assertEqual(self.com(act), {'cast -> case'})
+        self.assertEqual(self.com(act[0].extensions()),
+                         {'cost -> case', 'case -> case'})
+        # puzzles made before the change keep the words they were given
+        self.assertEqual(self.com(before.extensions()),
+                         {'cast -> case', 'most -> case'})
+
+    def test_word_list(self):
+        for ws in (['cost', 'cast', 'case'],
+                   {'cost': 1, 'cast': 2, 'case': 3}.keys()):
+            act = breadth_first_solve(WordLadderPuzzle('cost', 'case', ws),
+                                      compact=True)
+            self.assertEqual(act.moves, ['cast', 'case'])
+
+    def test_compiled_word_set(self):
+        words = set(self.words) | {'ab', 'ba', 'abcde', 'Abcd', 'abcé'}
+        path = os.path.join(tempfile.mkdtemp(), 'words.wl')
+        compile_word_set(words, path)
+        compiled = load_word_set(path)
+        self.assertEqual(set(compiled), words)
+        self.assertEqual(len(compiled), len(words))
+        for start in ['aaaa', 'abcd', 'abce', 'ab', 'zzzzz']:
+            exp = WordLadderPuzzle(start, 'abcd', words).extensions()
+            act = WordLadderPuzzle(start, 'abcd', compiled).extensions()
+            self.assertEqual([str(i) for i in exp], [str(i) for i in act])
+        copy = pickle.loads(pickle.dumps(compiled))
+        self.assertEqual(copy, compiled)
+        self.assertIn('abcé', copy)
+        copy.close()
+        compiled.close()
+
+    def test_bidirectional(self):
+        words = set(self.words) - {'abca', 'abcc'}
+        for start in ['aaaa', 'dddd', 'bbbb', 'zzzz']:
+            exp = breadth_first_solve(WordLadderPuzzle(start, 'abcd', words))
+            act = bidirectional_solve(WordLadderPuzzle(start, 'abcd', words))
+            self.assertEqual(self.length(exp), self.length(act))
+        self.assertIsNone(bidirectional_solve(
+            WordLadderPuzzle('aaaa', 'abcz', words)))
+
+    def test_compact(self):
+        words = set(self.words) - {'abca', 'abcc'}
+        solution = bidirectional_solve(
+            WordLadderPuzzle('aaaa', 'abcd', words), compact=True)
+        self.assertEqual(
+            self.length(solution.to_node()),
+            self.length(breadth_first_solve(
+                WordLadderPuzzle('aaaa', 'abcd', words))))
+        self.assertEqual(solution.moves[-1], 'abcd')
+        with self.assertRaises(ValueError):
+            WordLadderPuzzle('aaaa', 'abcd', words).apply_move('abcd')
+
+    def length(self, node):
+        if node is None:
+            return None
+        length = 0
+        while node.children:
+            self.assertIn(node.children[0].puzzle, node.puzzle.extensions())
+            node = node.children[0]
+            length += 1
+        self.assertTrue(node.puzzle.is_solved())
+        return length
+
     # def test_extension_regular2(self):
     #     ans1 = [WordLadderPuzzle(a, 'abcd', self.words) for a in self.words if len(self.count_difference(a, 'abcd')) == 1]
     #     act1 = WordLadderPuzzle('abcd', 'abcd', self.words).extensions()
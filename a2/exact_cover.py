@@ -0,0 +1,195 @@
+"""
+Assignment 2: Automatic Puzzle Solver
+==============================
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+=== Module Description ===
+This module contains an exact cover solver: Knuth's Algorithm X, using
+dancing links.
+"""
+
+from __future__ import annotations
+from typing import List, Optional, Sequence
+
+
+def exact_cover(num_columns: int, rows: Sequence[Sequence[int]],
+                chosen: Sequence[int] = ()) -> Optional[List[int]]:
+    """
+    Return the indices of some rows of <rows> that together contain each
+    column 0 .. num_columns - 1 exactly once, including every row in
+    <chosen>, or None if there are none.
+
+    Each row is given as the columns it contains.  The rows are returned
+    in the order they were chosen, starting with <chosen>.
+
+    >>> rows = [[2, 4, 5], [0, 3, 6], [1, 2, 5], [0, 3], [1, 6], [3, 4, 6]]
+    >>> exact_cover(7, rows)
+    [3, 0, 4]
+    >>> exact_cover(7, rows, [5])
+    >>> exact_cover(2, [[0], [0, 1]], [0, 1])
+    """
+    links = _Links(num_columns, rows)
+
+    # cover the columns of the rows already chosen
+    covered = set()
+    for i in chosen:
+        for c in rows[i]:
+            if c in covered:
+                return None
+            covered.add(c)
+            links.cover(c + 1)
+
+    # stack[k] is the node, in the column covered to choose it, of the
+    # k-th row chosen by the search
+    solution = list(chosen)
+    stack = []
+    while True:
+        c = links.smallest_column()
+        if c == 0:  # every column is covered
+            return solution + [links.row[r] for r in stack]
+
+        if links.size[c] > 0:
+            links.cover(c)
+            r = links.down[c]
+            links.choose(r)
+            stack.append(r)
+            continue
+
+        # backtrack to the last row with an untried sibling below it
+        while stack:
+            r = links.unchoose(stack.pop())
+            r = links.down[r]
+            if r != links.column[r]:
+                links.choose(r)
+                stack.append(r)
+                break
+            links.uncover(r)
+        else:
+            return None
+
+
+class _Links:
+    """
+    The toroidal doubly linked lists of dancing links, stored as parallel
+    lists indexed by node.
+
+    Node 0 is the root, nodes 1 .. num_columns are the column headers (for
+    columns 0 .. num_columns - 1), and the remaining nodes are the 1s of
+    the rows.
+
+    === Attributes ===
+    left, right: the neighbours of each node in its row (or, for the root
+        and headers, among the uncovered headers)
+    up, down: the neighbours of each node in its column
+    column: the header of the column of each node
+    row: the index of the row of each node (-1 for root and headers)
+    size: the number of nodes left in each column, by header
+    """
+    left: List[int]
+    right: List[int]
+    up: List[int]
+    down: List[int]
+    column: List[int]
+    row: List[int]
+    size: List[int]
+
+    def __init__(self, num_columns: int, rows: Sequence[Sequence[int]]):
+        """
+        Link the rows <rows> over columns 0 .. num_columns - 1.
+        """
+        headers = range(num_columns + 1)
+        self.left = [(i - 1) % (num_columns + 1) for i in headers]
+        self.right = [(i + 1) % (num_columns + 1) for i in headers]
+        self.up, self.down = list(headers), list(headers)
+        self.column, self.row = list(headers), [-1] * (num_columns + 1)
+        self.size = [0] * (num_columns + 1)
+
+        for i in range(len(rows)):
+            first = len(self.column)
+            for c in rows[i]:
+                node, header = len(self.column), c + 1
+                self.column.append(header)
+                self.row.append(i)
+                self.up.append(self.up[header])
+                self.down.append(header)
+                self.down[self.up[header]] = node
+                self.up[header] = node
+                self.size[header] += 1
+                self.left.append(node - 1)
+                self.right.append(node + 1)
+            if len(self.column) > first:
+                self.left[first] = len(self.column) - 1
+                self.right[len(self.column) - 1] = first
+
+    def smallest_column(self) -> int:
+        """
+        Return the header of an uncovered column with the fewest nodes,
+        or 0 if every column is covered.
+        """
+        right, size = self.right, self.size
+        best, c = 0, right[0]
+        while c != 0:
+            if best == 0 or size[c] < size[best]:
+                best = c
+                if size[c] == 0:
+                    break
+            c = right[c]
+        return best
+
+    def cover(self, c: int) -> None:
+        """
+        Remove header <c> and every row with a node in column c.
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        right[left[c]], left[right[c]] = right[c], left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]], up[down[j]] = down[j], up[j]
+                self.size[self.column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c: int) -> None:
+        """
+        Undo cover(c).
+        """
+        left, right, up, down = self.left, self.right, self.up, self.down
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                self.size[self.column[j]] += 1
+                down[up[j]] = up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = left[right[c]] = c
+
+    def choose(self, r: int) -> None:
+        """
+        Cover the columns of the other nodes in the row of node <r>.
+        """
+        j = self.right[r]
+        while j != r:
+            self.cover(self.column[j])
+            j = self.right[j]
+
+    def unchoose(self, r: int) -> int:
+        """
+        Undo choose(r), and return r.
+        """
+        j = self.left[r]
+        while j != r:
+            self.uncover(self.column[j])
+            j = self.left[j]
+        return r
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
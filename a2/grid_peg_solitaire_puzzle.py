@@ -11,9 +11,10 @@ any changes, are expressly prohibited.
 This module contains the class required to solve grid peg solitaire puzzles.
 """
 from __future__ import annotations
-from typing import List, Set
+from typing import List, Set, Tuple, Dict, Union, Any
 from puzzle import Puzzle
-import copy
+from functools import lru_cache
+from operator import xor
 
 
 class GridPegSolitairePuzzle(Puzzle):
@@ -21,17 +22,28 @@ class GridPegSolitairePuzzle(Puzzle):
     Snapshot of peg solitaire on a rectangular grid. May be solved,
     unsolved, or even unsolvable.
 
+    The grid is stored as a bitboard: bit (x * n + y) of an int stands for
+    the spot in row x and column y of an m x n grid.
+
     === Public Attributes ===
     None
 
     === Private Attributes ===
-    _marker: the m x n solitaire grid with some pegs, spaces and unused spots
+    _board: the shape of the grid, shared by all puzzles with that shape
+    _pegs: the bitboard of the spots holding a peg
+    _images: the images of _pegs under each of the symmetries of _board
+    _count: the number of pegs
     _marker_set: the possible symbols on the grid, representing different spots
 
     === Representation Invariants ===
-    _marker: a non-empty list of lists representing an m x n grid
-    strings in marker are all a valid string from marker_set
+    _pegs has no bit set for an unused spot of _board
+    _count is the number of bits set in _pegs
     """
+    _board: _Board
+    _pegs: int
+    _images: Tuple[int, ...]
+    _count: int
+    _marker_set: Set[str]
 
     def __init__(self, marker: List[List[str]], marker_set: Set[str]):
         """
@@ -46,16 +58,62 @@ class GridPegSolitairePuzzle(Puzzle):
         - the strings in marker are all a valid string from marker_set
         """
 
-        _marker: str
-        _marker_set: str
+        unused, pegs, count = 0, 0, 0
+        n = len(marker[0])
+        for x in range(len(marker)):
+            for y in range(n):
+                if marker[x][y] == "#":
+                    unused |= 1 << (x * n + y)
+                elif marker[x][y] == "*":
+                    pegs |= 1 << (x * n + y)
+                    count += 1
+        self._board = _board(len(marker), n, unused)
+        self._pegs, self._count = pegs, count
+        self._images = self._board.images(pegs)
+        self._marker_set = marker_set
+
+    @property
+    def _marker(self) -> List[List[str]]:
+        """
+        The m x n solitaire grid of this puzzle as a new list of lists of
+        "#", "*" and "." strings.
 
-        self._marker, self._marker_set = marker, marker_set
+        >>> grid = [["#", "*", "*"], ["*", ".", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"})._marker
+        [['#', '*', '*'], ['*', '.', '*']]
+        """
+        board = self._board
+        return [[board.symbol(self._pegs, x * board.n + y)
+                 for y in range(board.n)] for x in range(board.m)]
 
     def __eq__(self, other):
         return (type(other) == type(self) and
-                self._marker == other._marker and
+                self._board == other._board and
+                self._pegs == other._pegs and
                 self._marker_set == other._marker_set)
 
+    def __hash__(self):
+        return hash(self._pegs)
+
+    def state_key(self) -> int:
+        """
+        Return the canonical bitboard of the pegs of this
+        GridPegSolitairePuzzle: the smallest bitboard among its rotations
+        and reflections that fit the board.
+
+        A board can be solved exactly when its rotations and reflections
+        can, so the solvers treat them all as one state, and a board that
+        failed is never explored again in another orientation.
+
+        >>> grid = [["*", "*", "*"], ["*", ".", "*"]]
+        >>> bin(GridPegSolitairePuzzle(grid, {"*", ".", "#"}).state_key())
+        '0b101111'
+        >>> grid = [["*", ".", "*"], ["*", "*", "*"]]
+        >>> bin(GridPegSolitairePuzzle(grid, {"*", ".", "#"}).state_key())
+        '0b101111'
+        """
+        return min((self._pegs,) + self._images)
+
     def __str__(self):
         """
         Return a human-readable string representation of this
@@ -86,18 +144,7 @@ class GridPegSolitairePuzzle(Puzzle):
         """
         # "#" is for unused, "*" is for peg, "." is for empty
 
-        m = len(self._marker)
-        n = len(self._marker[0])
-        ans = ''
-
-        for x in range(m):
-            for y in range(n):
-                ans += self._marker[x][y]
-                if y != (n - 1):
-                    ans += ' '
-            if x != (m - 1):
-                ans += "\n"
-        return ans
+        return "\n".join(" ".join(row) for row in self._marker)
 
     def extensions(self) -> List[GridPegSolitairePuzzle]:
         """
@@ -142,60 +189,74 @@ class GridPegSolitairePuzzle(Puzzle):
         []
         """
 
-        m = len(self._marker)
-        n = len(self._marker[0])
-
         ans = []
 
         if self.is_solved():
             return []
 
-        else:
-            for x in range(m):
-                for y in range(n):
-
-                    if self._marker[x][y] == '*':
-
-                        # up
-                        if (x - 2) > 0 and self._marker[x-1][y] == "*" and \
-                                self._marker[x-2][y] == ".":
-                            temp = copy.deepcopy(self._marker)
-                            temp[x][y] = "."
-                            temp[x-1][y] = "."
-                            temp[x-2][y] = "*"
-                            temp = GridPegSolitairePuzzle(temp, self._marker_set)
-                            ans.append(temp)
-
-                        # down
-                        if (x + 2) < m and self._marker[x + 1][y] == "*" and \
-                                self._marker[x + 2][y] == ".":
-                            temp = copy.deepcopy(self._marker)
-                            temp[x][y] = "."
-                            temp[x + 1][y] = "."
-                            temp[x + 2][y] = "*"
-                            temp = GridPegSolitairePuzzle(temp, self._marker_set)
-                            ans.append(temp)
-
-                        # left
-                        if (y - 2) > 0 and self._marker[x][y - 1] == "*" and \
-                                self._marker[x][y - 2] == ".":
-                            temp = copy.deepcopy(self._marker)
-                            temp[x][y] = "."
-                            temp[x][y - 1] = "."
-                            temp[x][y - 2] = "*"
-                            temp = GridPegSolitairePuzzle(temp, self._marker_set)
-                            ans.append(temp)
-
-                        # right
-                        if (y + 2) < n and self._marker[x][y + 1] == "*" and \
-                                self._marker[x][y + 2] == ".":
-                            temp = copy.deepcopy(self._marker)
-                            temp[x][y] = "."
-                            temp[x][y + 1] = "."
-                            temp[x][y + 2] = "*"
-                            temp = GridPegSolitairePuzzle(temp, self._marker_set)
-                            ans.append(temp)
-            return ans
+        pegs, images = self._pegs, self._images
+        for bit, jumps in self._board.jumps:
+            if pegs & bit:
+                for over, to, mask, mask_images in jumps:
+                    if pegs & over and not pegs & to:
+                        ans.append(self._jump(
+                            pegs ^ mask, tuple(map(xor, images, mask_images))))
+        return ans
+
+    def move_to(self, extension: GridPegSolitairePuzzle) -> Tuple[int, int]:
+        """
+        Return the spots the jumping peg leaves and lands on to reach
+        <extension>, as the code of the move to it, where the spot in row
+        x and column y of an m x n grid is x * n + y.
+
+        >>> grid = [["*", "*", "."], [".", ".", "."]]
+        >>> p = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> p.move_to(p.extensions()[0])
+        (0, 2)
+        """
+        moved = self._pegs ^ extension._pegs
+        to = (moved & extension._pegs).bit_length() - 1
+        left = moved & self._pegs
+        while left:
+            i = (left & -left).bit_length() - 1
+            if (i, to) in self._board.moves:
+                return i, to
+            left &= left - 1
+        raise ValueError("the extension is not one jump away")
+
+    def apply_move(self, move: Tuple[int, int]) -> GridPegSolitairePuzzle:
+        """
+        Return the GridPegSolitairePuzzle after the peg on spot move[0]
+        jumps to spot move[1].
+
+        Raise ValueError if that is not a legal jump.
+
+        >>> grid = [["*", "*", "."], [".", ".", "."]]
+        >>> p = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> print(p.apply_move((0, 2)))
+        . . *
+        . . .
+        >>> p.apply_move((1, 3))
+        Traceback (most recent call last):
+        ...
+        ValueError: (1, 3) is not a legal jump
+        """
+        jump = self._board.moves.get(move)
+        pegs = self._pegs
+        if jump is None or not pegs & jump[0] or not pegs & jump[1] or \
+                pegs & jump[2]:
+            raise ValueError("{} is not a legal jump".format(move))
+        return self._jump(pegs ^ jump[3], tuple(map(xor, self._images,
+                                                    jump[4])))
+
+    def _jump(self, pegs: int,
+              images: Tuple[int, ...]) -> GridPegSolitairePuzzle:
+        # Return a puzzle on the same board as self with pegs and their
+        # images, which has one peg fewer than self.
+        ans = object.__new__(GridPegSolitairePuzzle)
+        ans._board, ans._pegs, ans._count = self._board, pegs, self._count - 1
+        ans._images, ans._marker_set = images, self._marker_set
+        return ans
 
     def is_solved(self) -> bool:
         """
@@ -222,22 +283,131 @@ class GridPegSolitairePuzzle(Puzzle):
         True
         """
 
-        m = len(self._marker)
-        n = len(self._marker[0])
-        count = 0
+        # puzzle is solved when there is exactly one "*" left
+        return self._count == 1
+
 
+class _Board:
+    """
+    The shape of a peg solitaire grid, and the jumps possible on it.
+
+    === Attributes ===
+    m: the number of rows
+    n: the number of columns
+    unused: the bitboard of the unused spots
+    symmetries: for each rotation or reflection other than the identity
+        that maps the usable spots onto themselves, the list of bits that
+        each spot is sent to
+    jumps: one (bit, [(over, to, mask, images), ...]) pair for each usable
+        spot, in row major order, where bit is the spot's bit, and each
+        over and to are the bits of the spot jumped over and the spot
+        landed on by a jump up, down, left or right (in that order) from
+        it, mask is the three bits together and images are the images of
+        mask under the symmetries
+    moves: maps each (spot jumped from, spot landed on) pair, numbering
+        spots in row major order, to (bit, over, to, mask, images) for
+        that jump
+    """
+    m: int
+    n: int
+    unused: int
+    symmetries: List[List[int]]
+    jumps: List[Tuple[int, List[Tuple[int, int, int, Tuple[int, ...]]]]]
+    moves: Dict[Tuple[int, int], Tuple[int, int, int, int, Tuple[int, ...]]]
+
+    def __init__(self, m: int, n: int, unused: int) -> None:
+        """
+        Create the m x n board with <unused> spots.
+        """
+        self.m, self.n, self.unused = m, n, unused
+
+        transforms = [lambda x, y: (m - 1 - x, n - 1 - y),
+                      lambda x, y: (m - 1 - x, y),
+                      lambda x, y: (x, n - 1 - y)]
+        if m == n:
+            transforms += [lambda x, y: (y, x),
+                           lambda x, y: (n - 1 - y, m - 1 - x),
+                           lambda x, y: (y, m - 1 - x),
+                           lambda x, y: (n - 1 - y, x)]
+        self.symmetries = []
+        for transform in transforms:
+            moved = [transform(i // n, i % n) for i in range(m * n)]
+            if all(self._usable(*moved[i]) for i in range(m * n)
+                   if self._usable(i // n, i % n)):
+                self.symmetries.append([1 << (x * n + y)
+                                        for (x, y) in moved])
+
+        self.jumps, self.moves = [], {}
         for x in range(m):
             for y in range(n):
-                if self._marker[x][y] == '*':
-                    count += 1
+                if not self._usable(x, y):
+                    continue
+                moves = []
+                for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                    if self._usable(x + dx, y + dy) and \
+                            self._usable(x + 2 * dx, y + 2 * dy):
+                        over = 1 << ((x + dx) * n + y + dy)
+                        to = 1 << ((x + 2 * dx) * n + y + 2 * dy)
+                        mask = (1 << (x * n + y)) | over | to
+                        moves.append((over, to, mask, self.images(mask)))
+                        self.moves[(x * n + y,
+                                    (x + 2 * dx) * n + y + 2 * dy)] = \
+                            (1 << (x * n + y),) + moves[-1]
+                self.jumps.append((1 << (x * n + y), moves))
+
+    def __reduce__(self):
+        # unpickle as the shared board of this shape
+        return _board, (self.m, self.n, self.unused)
+
+    def __eq__(self, other: Union[_Board, Any]) -> bool:
+        # compare shapes, not identity: threads that miss the cache of
+        # _board at the same time each build their own _Board
+        return self is other or (
+            type(other) == type(self) and
+            (self.m, self.n, self.unused) == (other.m, other.n, other.unused))
+
+    def __hash__(self) -> int:
+        return hash((self.m, self.n, self.unused))
+
+    def _usable(self, x: int, y: int) -> bool:
+        # Return whether (x, y) is a spot on this board that is not unused.
+        return (0 <= x < self.m and 0 <= y < self.n and
+                not self.unused >> (x * self.n + y) & 1)
+
+    def images(self, pegs: int) -> Tuple[int, ...]:
+        """
+        Return the images of bitboard <pegs> under each of the symmetries
+        of this board.
 
-        if count == 1:
-            # puzzle is solved when there is exactly one "*" left
-            return True
-        else:
-            return False
+        >>> _Board(2, 3, 0).images(0b000011)
+        (48, 24, 6)
+        """
+        ans = []
+        for moved in self.symmetries:
+            image = 0
+            for i in range(len(moved)):
+                if pegs >> i & 1:
+                    image |= moved[i]
+            ans.append(image)
+        return tuple(ans)
+
+    def symbol(self, pegs: int, i: int) -> str:
+        """
+        Return the symbol for spot <i> of this board given bitboard <pegs>.
+        """
+        if self.unused >> i & 1:
+            return "#"
+        return "*" if pegs >> i & 1 else "."
 
 
+@lru_cache(maxsize=None)
+def _board(m: int, n: int, unused: int) -> _Board:
+    """
+    Return the m x n _Board with <unused> spots, shared by every puzzle
+    of that shape.
+    """
+    return _Board(m, n, unused)
+
 if __name__ == "__main__":
     import doctest
 
@@ -257,3 +427,18 @@ if __name__ == "__main__":
     end = time.time()
     print("Solved 5x5 peg solitaire in {} seconds.".format(end - start))
     print("Using depth-first: \n{}".format(solution))
+
+    grid = [["#", "#", "*", "*", "*", "#", "#"],
+            ["#", "#", "*", "*", "*", "#", "#"],
+            ["*", "*", "*", "*", "*", "*", "*"],
+            ["*", "*", "*", ".", "*", "*", "*"],
+            ["*", "*", "*", "*", "*", "*", "*"],
+            ["#", "#", "*", "*", "*", "#", "#"],
+            ["#", "#", "*", "*", "*", "#", "#"]]
+    gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    start = time.time()
+    solution = depth_first_solve(gpsp)
+    end = time.time()
+    print("Solved English 33-hole peg solitaire in {} seconds.".format(
+        end - start))
+    print("Using depth-first: \n{}".format(solution))
@@ -0,0 +1,102 @@
+"""
+Assignment 2: Automatic Puzzle Solver
+==============================
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+=== Module Description ===
+This module contains the base class of the read-only binary files the
+solvers load, such as compiled word sets and pattern databases.
+"""
+
+from __future__ import annotations
+from typing import List, Optional, Union, Any
+import mmap
+
+
+class MappedFile:
+    """
+    A read-only file of one of the binary formats of this assignment.
+
+    The file is memory-mapped rather than read, so opening it is fast,
+    memory does not grow with its size, and processes opening the same
+    file share its pages.  It pickles as its path, so other processes map
+    the same file rather than copy it.
+
+    Every format starts with a header of unsigned 32-bit ints in native
+    byte order, the first two being MAGIC and VERSION.  Subclasses set
+    MAGIC, VERSION and KIND, and take views into the file with _view.
+
+    === Private Attributes ===
+    _path: the file this was loaded from
+    _file: the open file
+    _map: the memory map of _file
+    _header: the ints of the header
+    _views: the views into _map, released by close
+    """
+    _path: str
+    _header: List[int]
+    _views: List[memoryview]
+
+    MAGIC = 0
+    VERSION = 0
+    KIND = "mapped file"
+
+    def __init__(self, path: str, header_size: int) -> None:
+        """
+        Map the file stored at <path>, with a header of <header_size>
+        ints.
+
+        Raise ValueError if <path> is not a KIND.
+        """
+
+        self._path, self._views = path, []
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file cannot be mapped
+            self._file.close()
+            raise ValueError("{} is not a {}".format(path, self.KIND))
+        if len(self._map) >= 4 * header_size:
+            self._header = list(self._view(0, 4 * header_size, "I"))
+        if len(self._map) < 4 * header_size or \
+                self._header[0] != self.MAGIC or \
+                self._header[1] != self.VERSION:
+            self.close()
+            raise ValueError("{} is not a {}".format(path, self.KIND))
+
+    def _view(self, start: int, end: int,
+              format: Optional[str] = None) -> memoryview:
+        """
+        Return a view of bytes <start> to <end> of this file, cast to
+        <format> if it is given, to be released by close.
+        """
+
+        view = memoryview(self._map)[start:end]
+        if format is not None:
+            view = view.cast(format)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        """
+        Release the views, memory map and file of this MappedFile.
+        """
+
+        for view in self._views:
+            view.release()
+        self._map.close()
+        self._file.close()
+
+    def __reduce__(self):
+        return type(self), (self._path,)
+
+    def __eq__(self, other: Union[MappedFile, Any]) -> bool:
+        return type(other) == type(self) and self._path == other._path
+
+    def __hash__(self) -> int:
+        return hash(self._path)
@@ -12,39 +12,58 @@ This module contains the class required to solve mn puzzles.
 """
 
 from __future__ import annotations
-from typing import Tuple, List
+from typing import Tuple, List, Dict, Optional
 from puzzle import Puzzle
-import copy
+from pattern_database import PatternDatabase
+from bisect import bisect_left
+from functools import lru_cache
 
 class MNPuzzle(Puzzle):
     """
     An nxm puzzle, like the 15-puzzle, which may be solved, unsolved,
     or even unsolvable.
 
+    The grids are kept flat, as tuples in row major order, together with
+    the position of "*", so each extension is one swap away.
+
     === Public Attributes ===
     None
 
     === Private Attributes ===
     _n: the height of the grid
     _m: the width of the grid
-    _from_grid: the initial grid arrangement this puzzle begins at
-    _to_grid: the goal grid arrangement this puzzle aims to reach
+    _board: the current grid arrangement, flattened in row major order
+    _blank: the index of "*" in _board, or -1 if there is none
+    _target: the goal grid arrangement, flattened in row major order
+    _unsolvable: whether _board can never be slid into _target, or None
+                 if that has not been worked out yet; every extension
+                 shares it, since no slide changes it
+    _database: the pattern database heuristic uses, or None to use
+               Manhattan distance and linear conflicts
 
     === Representation Invariants ===
-    from_grid and to_grid are rectangular m x n grids
-
+    _board and _target have n * m symbols
+    _board[_blank] == "*" if _blank != -1
     """
 
     _n: int
     _m: int
-    _from_grid: Tuple
-    _to_grid: Tuple
-
-    def __init__(self, from_grid: Tuple, to_grid: Tuple) -> None:
+    _board: Tuple[str, ...]
+    _blank: int
+    _target: Tuple[str, ...]
+    _unsolvable: Optional[bool]
+    _database: Optional[PatternDatabase]
+
+    def __init__(self, from_grid: Tuple, to_grid: Tuple,
+                 database: Optional[PatternDatabase] = None) -> None:
         """
         MNPuzzle in state from_grid, working towards
         state to_grid.
 
+        If database is given, heuristic looks up this puzzle and its
+        extensions in that pattern database.  Raise ValueError if it was
+        built for a different target grid.
+
         Note:
             Grid symbols are represented as letters or numerals
             The empty space is represented as a "*"
@@ -54,13 +73,56 @@ class MNPuzzle(Puzzle):
         """
 
         self._n, self._m = len(from_grid), len(from_grid[0])
-        self._from_grid, self._to_grid = from_grid, to_grid
+        self._board = tuple(x for row in from_grid for x in row)
+        self._target = tuple(x for row in to_grid for x in row)
+        self._blank = self._board.index("*") if "*" in self._board else -1
+        self._unsolvable = None
+        if database is not None and database.target() != self._target:
+            raise ValueError("the pattern database is for another target")
+        self._database = database
+
+    @property
+    def _from_grid(self) -> Tuple[Tuple[str, ...], ...]:
+        """
+        Return the initial grid arrangement this puzzle begins at, as a
+        tuple of rows.
+
+        >>> target_grid = (("1", "2"), ("3", "*"))
+        >>> MNPuzzle((("*", "2"), ("1", "3")), target_grid)._from_grid
+        (('*', '2'), ('1', '3'))
+        """
+        return tuple(self._board[i:i + self._m]
+                     for i in range(0, len(self._board), self._m))
+
+    @property
+    def _to_grid(self) -> Tuple[Tuple[str, ...], ...]:
+        """
+        Return the goal grid arrangement this puzzle aims to reach, as a
+        tuple of rows.
+        """
+        return tuple(self._target[i:i + self._m]
+                     for i in range(0, len(self._target), self._m))
 
     def __eq__(self, other):
         return (type(other) == type(self) and
                 self._n == other._n and self._m == other._m and
-                self._from_grid == other._from_grid and
-                self._to_grid == other._to_grid)
+                self._board == other._board and
+                self._target == other._target)
+
+    def __hash__(self):
+        return hash(self._board)
+
+    def state_key(self) -> Tuple[str, ...]:
+        """
+        Return the current grid of this MNPuzzle, flattened in row major
+        order; the target grid is the same for every state of one solve.
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> MNPuzzle(start_grid, target_grid).state_key()
+        ('*', '2', '3', '1', '4', '5')
+        """
+        return self._board
 
     def __str__(self):
         """
@@ -88,34 +150,18 @@ class MNPuzzle(Puzzle):
         1 2 3
         4 5 *
         """
-        ans = ''
         separate = '-' * (2 * self._m - 1)
-
-        for x in range(self._n):
-            for y in range(self._m):
-                ans += self._from_grid[x][y]
-                if y != (self._m - 1):
-                    ans += ' '
-            if x != (self._n - 1):
-                ans += "\n"
-        ans = ans + "\n" + separate + "\n"
-
-        for x in range(self._n):
-            for y in range(self._m):
-                ans += self._to_grid[x][y]
-                if y != (self._m - 1):
-                    ans += ' '
-            if x != (self._n - 1):
-                ans += "\n"
-
-        return ans
+        return "\n".join([" ".join(row) for row in self._from_grid] +
+                         [separate] +
+                         [" ".join(row) for row in self._to_grid])
 
     def extensions(self) -> List[MNPuzzle]:
         """
         legal extensions are configurations that can be reached by swapping one
         symbol to the left, right, above, or below "*" with "*"
 
-        Return list of extensions of MNPuzzle self.
+        Return list of extensions of MNPuzzle self, moving "*" up, down,
+        left and then right.
 
         >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
         >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
@@ -123,57 +169,185 @@ class MNPuzzle(Puzzle):
         >>> lst = x.extensions()
         >>> len(lst)
         2
+        >>> lst[0].state_key()
+        ('1', '2', '3', '*', '4', '5')
+        """
+        blank = self._blank
+        if blank == -1:
+            return []
+        ans = []
+        for i in _moves(self._n, self._m)[blank]:
+            board = list(self._board)
+            board[blank], board[i] = board[i], "*"
+            ans.append(self._with_board(tuple(board), i))
+        return ans
+
+    def move_to(self, extension: MNPuzzle) -> int:
         """
+        Return the index in the flattened grid that "*" moves to in
+        <extension>, which is the code of the move to it.
 
-        def convert(j: List) -> tuple:
-            """
-            helper function to convert list to tuple
-            """
-            return tuple(i for i in j)
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> x = MNPuzzle(start_grid, target_grid)
+        >>> [x.move_to(y) for y in x.extensions()]
+        [3, 1]
+        """
+        return extension._blank
 
-        temp = [list(row) for row in self._from_grid]
-        ans = []
+    def apply_move(self, move: int) -> MNPuzzle:
+        """
+        Return the extension of this MNPuzzle with "*" moved to the index
+        <move> of the flattened grid.
+
+        Raise ValueError if that index is not next to "*".
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> print(MNPuzzle(start_grid, target_grid).apply_move(1))
+        2 * 3
+        1 4 5
+        -----
+        1 2 3
+        4 5 *
+        """
+        blank = self._blank
+        if blank == -1 or move not in _moves(self._n, self._m)[blank]:
+            raise ValueError("{} is not next to *".format(move))
+        board = list(self._board)
+        board[blank], board[move] = board[move], "*"
+        return self._with_board(tuple(board), move)
+
+    def _with_board(self, board: Tuple[str, ...], blank: int) -> MNPuzzle:
+        """
+        Return an MNPuzzle like this one, but at <board> with "*" at
+        index <blank>.
+        """
+        ans = object.__new__(MNPuzzle)
+        ans._n, ans._m, ans._target = self._n, self._m, self._target
+        ans._board, ans._blank = board, blank
+        ans._unsolvable = self._unsolvable
+        ans._database = self._database
+        return ans
+
+    def fail_fast(self) -> bool:
+        """
+        Return whether this MNPuzzle can never reach its target grid.
+
+        Each slide swaps "*" with a symbol, flipping the parity of the
+        permutation taking the current grid to the target, and moves "*"
+        one row or column, flipping the parity of its distance from its
+        target position.  So the two parities must agree.  When a symbol
+        appears more than once, only the symbols themselves are compared.
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid).fail_fast()
+        False
+        >>> MNPuzzle((("2", "1", "3"), ("4", "5", "*")), target_grid).fail_fast()
+        True
+        >>> MNPuzzle((("1", "2", "3"), ("4", "*", "6")), target_grid).fail_fast()
+        True
+        """
+        if self._unsolvable is None:
+            self._unsolvable = _parity_differs(self._board, self._target,
+                                               self._m)
+        return self._unsolvable
+
+    def goal(self) -> MNPuzzle:
+        """
+        Return the solved MNPuzzle this one is working towards.
 
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> print(MNPuzzle(start_grid, target_grid).goal())
+        1 2 3
+        4 5 *
+        -----
+        1 2 3
+        4 5 *
+        """
+        target = self._target
+        ans = self._with_board(target,
+                               target.index("*") if "*" in target else -1)
+        ans._unsolvable = False
+        return ans
+
+    def reverse_extensions(self) -> List[MNPuzzle]:
+        """
+        Return list of the MNPuzzles that have this one as an extension.
+        Every slide can be undone, so these are just the extensions.
+        """
+        return self.extensions()
+
+    def heuristic(self) -> int:
+        """
+        Return the Manhattan distance of this MNPuzzle plus its linear
+        conflicts, which never overestimates the number of moves left.
+        With a pattern database, return the larger of its estimate and
+        that sum, since a database of small groups may estimate less.
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid).heuristic()
+        3
+        >>> MNPuzzle((("2", "1", "3"), ("4", "5", "*")), target_grid).heuristic()
+        4
+        """
+        ans = self.manhattan_distance() + self.linear_conflict()
+        if self._database is not None:
+            ans = max(ans, self._database.estimate(self._board))
+        return ans
+
+    def manhattan_distance(self) -> int:
+        """
+        Return the sum over all symbols other than "*" of the number of
+        rows and columns between the symbol and its nearest place in the
+        target grid.
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> MNPuzzle(start_grid, target_grid).manhattan_distance()
+        3
+        """
+        distances = _distances(self._target, self._m)
+        total = 0
+        for i, symbol in enumerate(self._board):
+            if symbol != "*":
+                total += distances[symbol][i]
+        return total
+
+    def linear_conflict(self) -> int:
+        """
+        Return the number of extra moves forced by pairs of symbols that
+        are in their target row (or column) but in the wrong order, so
+        that one of them must leave the row and come back.
+
+        Only symbols that appear once in the target grid are counted.
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("3", "2", "1"), ("4", "5", "*"))
+        >>> MNPuzzle(start_grid, target_grid).linear_conflict()
+        4
+        """
+        goals = _goal_positions(self._to_grid)
+        board, m = self._board, self._m
+        total = 0
+        # goal columns of the symbols in each row that belong in that row,
+        # from left to right; likewise goal rows for each column
         for x in range(self._n):
+            line = []
             for y in range(self._m):
-                if self._from_grid[x][y] == "*":
-
-                    # up
-                    if (x - 1) >= 0:
-                        temp1 = copy.deepcopy(temp)
-                        temp1[x][y], temp1[x - 1][y] = \
-                            temp1[x - 1][y], temp1[x][y]
-                        temp1 = convert(temp1)
-                        temp1 = MNPuzzle(temp1, self._to_grid)
-                        ans.append(temp1)
-
-                    # down
-                    if (x + 1) < self._n:
-                        temp1 = copy.deepcopy(temp)
-                        temp1[x][y], temp1[x + 1][y] = \
-                            temp1[x + 1][y], temp1[x][y]
-                        temp1 = convert(temp1)
-                        temp1 = MNPuzzle(temp1, self._to_grid)
-                        ans.append(temp1)
-
-                    # left
-                    if (y - 1) >= 0:
-                        temp1 = copy.deepcopy(temp)
-                        temp1[x][y], temp1[x][y - 1] = \
-                            temp1[x][y - 1], temp1[x][y]
-                        temp1 = convert(temp1)
-                        temp1 = MNPuzzle(temp1, self._to_grid)
-                        ans.append(temp1)
-
-                    # right
-                    if (y + 1) < self._m:
-                        temp1 = copy.deepcopy(temp)
-                        temp1[x][y], temp1[x][y + 1] = \
-                            temp1[x][y + 1], temp1[x][y]
-                        temp1 = convert(temp1)
-                        temp1 = MNPuzzle(temp1, self._to_grid)
-                        ans.append(temp1)
-        return ans
+                goal = goals.get(board[x * m + y])
+                if goal is not None and len(goal) == 1 and goal[0][0] == x:
+                    line.append(goal[0][1])
+            total += 2 * (len(line) - _longest_increasing(line))
+        for y in range(self._m):
+            line = []
+            for x in range(self._n):
+                goal = goals.get(board[x * m + y])
+                if goal is not None and len(goal) == 1 and goal[0][1] == y:
+                    line.append(goal[0][0])
+            total += 2 * (len(line) - _longest_increasing(line))
+        return total
 
     def is_solved(self) -> bool:
         """
@@ -181,10 +355,122 @@ class MNPuzzle(Puzzle):
 
         puzzle is solved when from_grid is the same as to_grid
         """
-        if self._from_grid == self._to_grid:
-            return True
+        return self._board == self._target
+
+
+@lru_cache(maxsize=None)
+def _goal_positions(to_grid: Tuple) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Return a dictionary mapping each symbol other than "*" in <to_grid> to
+    the (row, column) positions where it appears.
+
+    >>> _goal_positions((("1", "2"), ("1", "*")))
+    {'1': [(0, 0), (1, 0)], '2': [(0, 1)]}
+    """
+    ans = {}
+    for x in range(len(to_grid)):
+        for y in range(len(to_grid[x])):
+            if to_grid[x][y] != "*":
+                ans.setdefault(to_grid[x][y], []).append((x, y))
+    return ans
+
+
+def _parity_differs(board: Tuple[str, ...], target: Tuple[str, ...],
+                    m: int) -> bool:
+    """
+    Return whether the flattened grid <board>, of width <m>, can be told
+    apart from <target> by the symbols they hold, or by the parity of the
+    permutation between them against that of the distance between their
+    "*"s, so that no sequence of slides turns one into the other.
+
+    >>> _parity_differs(("1", "2", "3", "*"), ("1", "2", "3", "*"), 2)
+    False
+    >>> _parity_differs(("*", "2", "1", "3"), ("1", "2", "3", "*"), 2)
+    False
+    >>> _parity_differs(("2", "1", "3", "*"), ("1", "2", "3", "*"), 2)
+    True
+    >>> _parity_differs(("1", "1", "2", "*"), ("1", "2", "1", "*"), 2)
+    False
+    """
+    if sorted(board) != sorted(target):
+        return True
+    if "*" not in board:
+        return board != target
+    if len(set(target)) < len(target):
+        return False
+    # the parity of a permutation is that of its length minus its
+    # number of cycles
+    place = {symbol: i for i, symbol in enumerate(target)}
+    perm = [place[symbol] for symbol in board]
+    parity = len(perm)
+    for i in range(len(perm)):
+        if perm[i] != -1:
+            parity -= 1
+            j = i
+            while perm[j] != -1:
+                perm[j], j = -1, perm[j]
+    b, t = board.index("*"), target.index("*")
+    distance = abs(b // m - t // m) + abs(b % m - t % m)
+    return parity % 2 != distance % 2
+
+
+@lru_cache(maxsize=None)
+def _moves(n: int, m: int) -> List[List[int]]:
+    """
+    Return, for each index of a flattened n x m grid, the indices next to
+    it above, below, to the left and to the right, in that order.
+
+    >>> _moves(2, 3)
+    [[3, 1], [4, 0, 2], [5, 1], [0, 4], [1, 3, 5], [2, 4]]
+    """
+    ans = []
+    for x in range(n):
+        for y in range(m):
+            ans.append([i * m + j
+                        for (i, j) in ((x - 1, y), (x + 1, y),
+                                       (x, y - 1), (x, y + 1))
+                        if 0 <= i < n and 0 <= j < m])
+    return ans
+
+
+@lru_cache(maxsize=None)
+def _distances(target: Tuple[str, ...],
+               m: int) -> Dict[str, Tuple[int, ...]]:
+    """
+    Return a dictionary mapping each symbol other than "*" in the
+    flattened grid <target>, of width <m>, to the number of rows and
+    columns between each index and the nearest place of that symbol in
+    <target>.
+
+    >>> _distances(("1", "2", "1", "*"), 2)["2"]
+    (1, 0, 2, 1)
+    """
+    goals = _goal_positions(tuple(target[i:i + m]
+                                  for i in range(0, len(target), m)))
+    return {symbol: tuple(min(abs(i // m - x) + abs(i % m - y)
+                              for (x, y) in places)
+                          for i in range(len(target)))
+            for symbol, places in goals.items()}
+
+
+def _longest_increasing(lst: List[int]) -> int:
+    """
+    Return the length of the longest strictly increasing subsequence
+    of <lst>.
+
+    >>> _longest_increasing([2, 0, 1])
+    2
+    >>> _longest_increasing([])
+    0
+    """
+    tails = []
+    for x in lst:
+        i = bisect_left(tails, x)
+        if i == len(tails):
+            tails.append(x)
         else:
-            return False
+            tails[i] = x
+    return len(tails)
 
 
 if __name__ == "__main__":
@@ -194,14 +480,39 @@ if __name__ == "__main__":
     target_grid = (("1", "2", "3"), ("4", "5", "*"))
     start_grid = (("*", "2", "3"), ("1", "4", "5"))
     from puzzle_tools import breadth_first_solve, depth_first_solve
+    from puzzle_tools import TimedContext
     from time import time
+    start, context = time(), TimedContext()
+    solution = breadth_first_solve(MNPuzzle(start_grid, target_grid),
+                                   context)
+    end = time()
+    print("BFS solved: \n\n{} \n\nin {} seconds\n{}".format(
+        solution, end - start, context.stats(True)))
+    start, context = time(), TimedContext()
+    solution = depth_first_solve(MNPuzzle(start_grid, target_grid), context)
+    end = time()
+    print("DFS solved: \n\n{} \n\nin {} seconds\n{}".format(
+        solution, end - start, context.stats(True)))
+
+    from puzzle_tools import ida_star_solve
+    target_grid = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+    start_grid = (("8", "6", "7"), ("2", "5", "4"), ("3", "*", "1"))
     start = time()
-    solution = breadth_first_solve(MNPuzzle(start_grid, target_grid))
+    solution = ida_star_solve(MNPuzzle(start_grid, target_grid))
     end = time()
-    print("BFS solved: \n\n{} \n\nin {} seconds".format(
+    print("IDA* solved: \n\n{} \n\nin {} seconds".format(
         solution, end - start))
+
+    import os
+    import tempfile
+    from pattern_database import build_pattern_database, default_groups
+    from pattern_database import load_pattern_database
+    path = os.path.join(tempfile.mkdtemp(), "eight.pdb")
+    build_pattern_database(target_grid,
+                           default_groups(sum(target_grid, ()), 4), path)
+    database = load_pattern_database(path)
     start = time()
-    solution = depth_first_solve((MNPuzzle(start_grid, target_grid)))
+    solution = ida_star_solve(MNPuzzle(start_grid, target_grid, database))
     end = time()
-    print("DFS solved: \n\n{} \n\nin {} seconds".format(
-        solution, end - start))
+    print("IDA* with a pattern database solved: \n\n{} \n\nin {} "
+          "seconds".format(solution, end - start))
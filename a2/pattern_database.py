@@ -0,0 +1,265 @@
+"""
+Assignment 2: Automatic Puzzle Solver
+==============================
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+=== Module Description ===
+This module contains disjoint additive pattern databases, a heuristic for
+MNPuzzles that is much stronger than Manhattan distance.
+
+The symbols of the target grid are split into groups.  For each group,
+the database holds, for every way of placing that group's symbols, the
+fewest slides of those symbols needed to bring them to their target
+places, with the other symbols left unnamed and their slides not
+counted.  Every real slide moves one symbol of one group, and is counted
+only for that group, so the sum over the groups never overestimates the
+number of slides left.
+
+Build a database ahead of time from the command line, e.g. for the
+15-puzzle in groups of 5:
+
+    python pattern_database.py 4 4 fifteen.pdb --group-size 5
+
+and pass the result of load_pattern_database to MNPuzzle.
+"""
+
+from __future__ import annotations
+from typing import List, Tuple, Sequence
+from array import array
+from collections import deque
+from mapped_file import MappedFile
+
+
+class PatternDatabase(MappedFile):
+    """
+    A read-only pattern database loaded from a file written by
+    build_pattern_database, memory-mapped, so opening even a large
+    database is fast.
+
+    File layout, in native byte order: a header of six unsigned 32-bit
+    ints (magic, version, height n, width m, number of groups G, length L
+    of the target bytes); G group sizes; for each group, the index in the
+    flattened target grid of each of its symbols; the target symbols in
+    UTF-8, each followed by a 0 byte, L bytes in all; and finally one
+    table of unsigned bytes per group.  The entry of a table for the
+    placing with the i-th symbol of the group at index p_i of the
+    flattened grid is at sum of p_i * (n * m) ** i.
+
+    === Private Attributes ===
+    _n: the height of the grids this database is for
+    _m: the width of the grids this database is for
+    _target: the flattened target grid this database is for
+    _groups: the symbols of each group
+    _tables: the table of each group
+    """
+    _n: int
+    _m: int
+    _target: Tuple[str, ...]
+    _groups: List[Tuple[str, ...]]
+    _tables: List[memoryview]
+
+    MAGIC = 0x4D_4E_50_44
+    VERSION = 1
+    KIND = "pattern database"
+
+    def __init__(self, path: str) -> None:
+        """
+        Load the pattern database stored at <path>.
+
+        Raise ValueError if <path> is not a pattern database.
+        """
+
+        MappedFile.__init__(self, path, 6)
+        self._n, self._m, g, length = self._header[2:6]
+
+        offset = 24
+        sizes = list(self._view(offset, offset + 4 * g, "I"))
+        offset += 4 * g
+        places = list(self._view(offset, offset + 4 * sum(sizes), "I"))
+        offset += 4 * sum(sizes)
+        self._target = tuple(self._map[offset:offset + length].decode(
+            "utf-8").split("\0")[:-1])
+        offset += length
+        self._groups, self._tables, k = [], [], self._n * self._m
+        for size in sizes:
+            self._groups.append(tuple(self._target[i]
+                                      for i in places[:size]))
+            places = places[size:]
+            self._tables.append(self._view(offset, offset + k ** size))
+            offset += k ** size
+
+    def target(self) -> Tuple[str, ...]:
+        """
+        Return the flattened target grid this database is for.
+        """
+        return self._target
+
+    def estimate(self, board: Sequence[str]) -> int:
+        """
+        Return the sum over the groups of the fewest slides of the group's
+        symbols that bring them from where they are in the flattened grid
+        <board> to their target places.
+        """
+        where = {symbol: i for i, symbol in enumerate(board)}
+        k, total = len(board), 0
+        for group, table in zip(self._groups, self._tables):
+            index, weight = 0, 1
+            for symbol in group:
+                index += where[symbol] * weight
+                weight *= k
+            total += table[index]
+        return total
+
+
+def default_groups(target: Sequence[str],
+                   size: int) -> List[Tuple[str, ...]]:
+    """
+    Return the symbols other than "*" of the flattened grid <target>, in
+    order, in groups of <size> (the last group may be smaller).
+
+    >>> default_groups(("1", "2", "3", "4", "5", "*"), 2)
+    [('1', '2'), ('3', '4'), ('5',)]
+    """
+    symbols = [x for x in target if x != "*"]
+    return [tuple(symbols[i:i + size]) for i in range(0, len(symbols), size)]
+
+
+def build_pattern_database(to_grid: Tuple, groups: List[Tuple[str, ...]],
+                           path: str) -> None:
+    """
+    Write the pattern database for <to_grid>, with the symbols split into
+    <groups>, to <path>, in the format loaded by load_pattern_database.
+
+    Raise ValueError if <to_grid> has no "*", if the groups share a
+    symbol, or name "*" or a symbol that is not in <to_grid> or is in it
+    more than once, or if a table entry would be above 254.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "five.pdb")
+    >>> target = (("1", "2", "3"), ("4", "5", "*"))
+    >>> build_pattern_database(target, [("1", "2"), ("3", "4", "5")], path)
+    >>> db = load_pattern_database(path)
+    >>> db.estimate(("1", "2", "3", "4", "5", "*"))
+    0
+    >>> db.estimate(("*", "2", "3", "1", "4", "5"))
+    3
+    >>> db.estimate(("2", "1", "3", "4", "5", "*"))
+    6
+    >>> db.close()
+    """
+    # mn_puzzle imports this module, so import it only once it is loaded
+    from mn_puzzle import _moves
+
+    n, m = len(to_grid), len(to_grid[0])
+    target = tuple(x for row in to_grid for x in row)
+    symbols = [x for group in groups for x in group]
+    if "*" not in target:
+        raise ValueError("the target grid has no \"*\"")
+    if len(set(symbols)) != len(symbols) or \
+            any(target.count(x) != 1 or x == "*" for x in symbols):
+        raise ValueError("groups must be disjoint, and each symbol must "
+                         "appear once in the target grid")
+
+    tables = [_group_table(target, group, _moves(n, m)) for group in groups]
+
+    blob = "".join(x + "\0" for x in target).encode("utf-8")
+    header = array("I", [PatternDatabase.MAGIC, PatternDatabase.VERSION,
+                         n, m, len(groups), len(blob)])
+    with open(path, "wb") as f:
+        header.tofile(f)
+        array("I", [len(group) for group in groups]).tofile(f)
+        array("I", [target.index(x) for x in symbols]).tofile(f)
+        f.write(blob)
+        for table in tables:
+            table.tofile(f)
+
+
+def _group_table(target: Tuple[str, ...], group: Tuple[str, ...],
+                 moves: List[List[int]]) -> array:
+    """
+    Return the table of <group> for the flattened grid <target>, where
+    moves[i] lists the indices next to index i.
+
+    The search runs backwards from the target over the places of the
+    group's symbols together with the place of "*", which the table then
+    forgets.  Slides are undone by slides, so the fewest slides to reach
+    a placing from the target is the fewest back to it.  A slide of some
+    other symbol costs nothing, so reached placings go to the front of
+    the queue, and the queue stays in order of cost.
+    """
+    k, size = len(target), len(group)
+    # the entry for the group at places p_0 .. p_size-1 and "*" at
+    # p_size is at sum of p_i * weights[i]
+    weights = [k ** i for i in range(size + 1)]
+    costs = bytearray(b"\xff") * (k ** (size + 1))
+    start = tuple(target.index(x) for x in group) + (target.index("*"),)
+    costs[sum(p * w for p, w in zip(start, weights))] = 0
+    queue = deque([(start, 0)])
+    while queue:
+        places, cost = queue.popleft()
+        index = sum(p * w for p, w in zip(places, weights))
+        if costs[index] != cost:  # reached more cheaply since
+            continue
+        blank = places[size]
+        for q in moves[blank]:
+            if q in places:  # slide a symbol of the group into "*"
+                if cost + 1 > 254:
+                    raise ValueError("a pattern database table entry is "
+                                     "too large")
+                i = places.index(q)
+                j = index + (blank - q) * (weights[i] - weights[size])
+                if costs[j] > cost + 1:
+                    costs[j] = cost + 1
+                    queue.append((places[:i] + (blank,) +
+                                  places[i + 1:size] + (q,), cost + 1))
+            else:
+                j = index + (q - blank) * weights[size]
+                if costs[j] > cost:
+                    costs[j] = cost
+                    queue.appendleft((places[:size] + (q,), cost))
+
+    table = array("B", [255]) * weights[size]
+    for j in range(len(costs)):
+        if costs[j] < table[j % weights[size]]:
+            table[j % weights[size]] = costs[j]
+    return table
+
+
+def load_pattern_database(path: str) -> PatternDatabase:
+    """
+    Return the pattern database stored at <path>, memory-mapped.
+    """
+    return PatternDatabase(path)
+
+
+if __name__ == "__main__":
+    import argparse
+    from time import time
+
+    parser = argparse.ArgumentParser(
+        description="Build a pattern database for MNPuzzles of one shape.")
+    parser.add_argument("n", type=int, help="the height of the grid")
+    parser.add_argument("m", type=int, help="the width of the grid")
+    parser.add_argument("path", help="the file to write the database to")
+    parser.add_argument("--group-size", type=int, default=4,
+                        help="the most symbols in one group (default 4)")
+    parser.add_argument("--target", nargs="+", metavar="SYMBOL",
+                        help="the target grid, row by row (default 1, 2, "
+                             "..., n * m - 1 and then *)")
+    args = parser.parse_args()
+
+    cells = args.target or [str(i) for i in range(1, args.n * args.m)] + \
+        ["*"]
+    if len(cells) != args.n * args.m:
+        parser.error("the target grid needs {} symbols".format(
+            args.n * args.m))
+    grid = tuple(tuple(cells[i:i + args.m])
+                 for i in range(0, len(cells), args.m))
+    start = time()
+    build_pattern_database(grid, default_groups(cells, args.group_size),
+                           args.path)
+    print("built {} in {:.1f} seconds".format(args.path, time() - start))
@@ -12,13 +12,16 @@ This module contains the abstract Puzzle class.
 """
 
 from __future__ import annotations
-from typing import List
+from typing import List, Hashable, Optional
 
 class Puzzle:
     """"
     Snapshot of a full-information puzzle, which may be solved, unsolved,
     or even unsolvable.
     """
+    # no instance attributes here, so subclasses that list theirs in
+    # __slots__ do without a per-instance __dict__
+    __slots__ = ()
 
     def fail_fast(self) -> bool:
         """
@@ -30,6 +33,57 @@ class Puzzle:
 
         return False
 
+    def goal(self) -> Optional[Puzzle]:
+        """
+        Return the solved Puzzle that Puzzle self is working towards, or
+        None if there is no single such Puzzle.
+
+        Override this, together with reverse_extensions, in a subclass
+        with an explicit target, so it can be searched from both ends.
+        """
+
+        return None
+
+    def reverse_extensions(self) -> List[Puzzle]:
+        """
+        Return list of the puzzles that have Puzzle self among their
+        extensions.
+
+        This only needs to be implemented in a subclass whose goal method
+        returns a Puzzle.
+        """
+
+        raise NotImplementedError
+
+    def heuristic(self) -> int:
+        """
+        Return an estimate of the number of extensions needed to get from
+        Puzzle self to a solution, for use by informed solvers.
+
+        Override this in a subclass where a better estimate is known.  To
+        keep solutions shortest, it must never overestimate.
+        """
+
+        return 0
+
+    def state_key(self) -> Hashable:
+        """
+        Return a compact hashable key identifying the state of Puzzle self.
+
+        The solvers store these keys, rather than whole puzzles, to remember
+        which states they have already explored.  Puzzles that are equal must
+        have equal keys.  The key only has to tell apart puzzles that can be
+        reached from one another, so attributes shared by every puzzle of a
+        single solve (e.g. the goal) may be left out.
+
+        Override this in a subclass with something cheaper than the
+        default, which falls back to the string representation.  A
+        subclass that defines __eq__ loses the inherited __hash__, so it
+        must define its own, e.g. as the hash of its state key.
+        """
+
+        return str(self)
+
     def is_solved(self) -> bool:
         """
         Return True iff Puzzle self is solved.
@@ -52,3 +106,30 @@ class Puzzle:
         """
 
         raise NotImplementedError
+
+    def move_to(self, extension: Puzzle) -> Hashable:
+        """
+        Return a compact code for the move from Puzzle self to
+        <extension>, one of its extensions, that apply_move turns back
+        into <extension>.
+
+        Override this, together with apply_move, in a subclass where a
+        move has a cheaper code than the default, which is the position
+        of <extension> among the extensions of Puzzle self.
+        """
+
+        key = extension.state_key()
+        return [x.state_key() for x in self.extensions()].index(key)
+
+    def apply_move(self, move: Hashable) -> Puzzle:
+        """
+        Return the extension of Puzzle self that <move>, a code returned
+        by move_to, leads to.
+
+        Raise ValueError if <move> is not a move from Puzzle self.
+        """
+
+        extensions = self.extensions()
+        if not isinstance(move, int) or not 0 <= move < len(extensions):
+            raise ValueError("{} is not a move from {}".format(move, self))
+        return extensions[move]
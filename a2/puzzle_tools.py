@@ -9,95 +9,1274 @@ any changes, are expressly prohibited.
 
 === Module Description ===
 This module contains the functions that find solutions to puzzles, step by step.
+
+Every solver returns a chain of PuzzleNodes, or with compact, a
+MoveSequence of the start puzzle and the codes of the moves from it,
+which is much cheaper to keep or send for long solutions.
+
+Every solver returns None straight away for a puzzle that fails fast, and
+never searches extensions that fail fast.
+
+depth_first_solve and breadth_first_solve take budgets on the puzzles
+expanded, the time taken and the states visited, and return a
+BudgetExceeded rather than None when one runs out, so a puzzle with no
+solution can be told apart from one that was too hard.
 """
 
 from __future__ import annotations
-from typing import List, Optional, Union, Any
+from typing import List, Optional, Union, Any, Set, Hashable, Callable, \
+    Tuple, Iterator, Iterable, Sequence, Generator, Dict, AsyncIterator
 from puzzle import Puzzle
 
-# importing a Queue class to possibly use for breadth_first_solve
-from collections import deque
-
-# set higher recursion limit
-# which is needed in PuzzleNode.__str__
+# compact parent indices for breadth_first_solve
+from array import array
+# worker processes for parallel_solve and solve_many
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, \
+    FIRST_COMPLETED, Future
+from itertools import islice
+import multiprocessing
+import os
+# time budgets, and the timings of TimedContext
+from time import monotonic, perf_counter
+# the sizes of visited sets
 import sys
-sys.setrecursionlimit(10**6)
+# pausing searches for async_solve, and solve_many_async
+import asyncio
+# a binary heap for astar_solve
+from heapq import heappush, heappop
+
+
+class SolverContext:
+    """
+    The working state of one search by a solver in this module.
+
+    Every solve makes its own SolverContext unless one is passed in, so
+    solves can run back to back, or in separate threads, without sharing
+    visited states.  A SolverContext must not be shared between solves
+    that run at the same time.
+
+    === Attributes ===
+    visited: the state keys of the puzzles seen so far in this search
+    expanded: the number of puzzles whose extensions have been generated
+    generated: the number of extensions generated so far
+    pruned: the number of generated extensions dropped because they
+        fail fast
+    duplicates: the number of puzzles reached again, and so skipped
+    max_frontier: the most puzzles waiting to be expanded at once (for
+        the depth-first solvers, the longest path)
+    callback: a function called with this SolverContext and the puzzle
+        after each expansion, or None
+    max_expansions: the most puzzles this search may expand, or None for
+        no limit
+    max_visited: the most states this search may visit before it stops
+        expanding, or None for no limit
+    deadline: the time.monotonic() from which on this search gives up,
+        or None for no limit
+    stop: a function returning whether this search should give up, asked
+        before each expansion, or None to never give up
+    exceeded: which budget stopped this search early: "expansions",
+        "visited", "time" or "stopped", or None if none has
+    cut_off: whether this search was stopped early
+
+    === Representation Invariants ===
+    expanded <= max_expansions if max_expansions is not None
+    cut_off == (exceeded is not None)
+    """
+    visited: Set[Hashable]
+    expanded: int
+    generated: int
+    pruned: int
+    duplicates: int
+    max_frontier: int
+    callback: Optional[Callable[[SolverContext, Puzzle], None]]
+    max_expansions: Optional[int]
+    max_visited: Optional[int]
+    deadline: Optional[float]
+    stop: Optional[Callable[[], bool]]
+    exceeded: Optional[str]
+    cut_off: bool
+
+    def __init__(self, max_expansions: Optional[int] = None,
+                 stop: Optional[Callable[[], bool]] = None,
+                 max_visited: Optional[int] = None,
+                 deadline: Optional[float] = None,
+                 callback: Optional[Callable[[SolverContext, Puzzle],
+                                             None]] = None) -> None:
+        """
+        Create a new, empty SolverContext that allows at most
+        <max_expansions> expansions, stops expanding once <max_visited>
+        states are visited, gives up at <deadline> or once <stop>
+        returns True, and calls <callback> after each expansion.
+        """
+
+        self.visited = set()
+        self.expanded, self.generated, self.pruned = 0, 0, 0
+        self.duplicates, self.max_frontier = 0, 0
+        self.callback = callback
+        self.max_expansions, self.max_visited = max_expansions, max_visited
+        self.deadline, self.stop = deadline, stop
+        self.exceeded, self.cut_off = None, False
+
+    def visit(self, puzzle: Puzzle) -> bool:
+        """
+        Record <puzzle> as visited.  Return True iff it had not been
+        visited before.
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> context = SolverContext()
+        >>> context.visit(WordLadderPuzzle("on", "no", {"on", "no"}))
+        True
+        >>> context.visit(WordLadderPuzzle("on", "no", {"on", "no"}))
+        False
+        """
+
+        key = puzzle.state_key()
+        if key in self.visited:
+            self.duplicates += 1
+            return False
+        self.visited.add(key)
+        return True
+
+    def is_solved(self, puzzle: Puzzle) -> bool:
+        """
+        Return whether <puzzle> is solved.  The solvers ask through here,
+        so subclasses can watch the checks.
+        """
+
+        return puzzle.is_solved()
+
+    def key(self, puzzle: Puzzle) -> Hashable:
+        """
+        Return the state key of <puzzle>.  Solvers that keep their own
+        tables of states, rather than using visit, ask through here, so
+        subclasses can watch the hashing.
+        """
+
+        return puzzle.state_key()
+
+    def frontier(self, size: int) -> None:
+        """
+        Record that <size> puzzles are waiting to be expanded.
+        """
+
+        if size > self.max_frontier:
+            self.max_frontier = size
+
+    def visited_bytes(self) -> int:
+        """
+        Return the memory taken by the visited set and its keys, not
+        counting objects the keys share with each other or the puzzles.
+
+        >>> context = SolverContext()
+        >>> context.visited_bytes() == sys.getsizeof(set())
+        True
+        """
+
+        return sys.getsizeof(self.visited) + sum(
+            sys.getsizeof(key) for key in self.visited)
+
+    def stats(self, memory: bool = False) -> Dict[str, Any]:
+        """
+        Return the counters of this search, by name.  If <memory>, also
+        return visited_bytes as "visited_bytes"; it is left out by default
+        because it takes time linear in the size of the visited set.
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> context = SolverContext()
+        >>> ws = {"cost", "cast", "case", "most", "mist"}
+        >>> _ = breadth_first_solve(WordLadderPuzzle("mist", "case", ws),
+        ...                         context)
+        >>> stats = context.stats()
+        >>> stats["expanded"], stats["generated"], stats["duplicates"]
+        (4, 7, 3)
+        >>> stats["max_frontier"], stats["branching"]
+        (1, 1.75)
+        >>> "visited_bytes" in stats
+        False
+        >>> context.stats(True)["visited_bytes"] == context.visited_bytes()
+        True
+        """
+
+        ans = {"expanded": self.expanded, "generated": self.generated,
+               "pruned": self.pruned, "duplicates": self.duplicates,
+               "visited": len(self.visited),
+               "max_frontier": self.max_frontier,
+               "branching": self.generated / max(self.expanded, 1),
+               "exceeded": self.exceeded}
+        if memory:
+            ans["visited_bytes"] = self.visited_bytes()
+        return ans
+
+    def expand(self, puzzle: Puzzle, reverse: bool = False) -> List[Puzzle]:
+        """
+        Return the extensions of <puzzle>, or its reverse extensions if
+        <reverse>, counting the expansion.  Extensions that fail fast are
+        left out, so no solver spends time on them.
+
+        Once a budget has run out, set exceeded and cut_off and return no
+        extensions, so the search winds down.
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> context = SolverContext(1)
+        >>> len(context.expand(WordLadderPuzzle("on", "no", {"oo", "no"})))
+        1
+        >>> context.expand(WordLadderPuzzle("oo", "no", {"on", "no"}))
+        []
+        >>> context.expanded, context.generated, context.exceeded
+        (1, 1, 'expansions')
+        """
+
+        if self.exceeded is None:
+            if self.max_expansions is not None and \
+                    self.expanded >= self.max_expansions:
+                self.exceeded = "expansions"
+            elif self.max_visited is not None and \
+                    len(self.visited) >= self.max_visited:
+                self.exceeded = "visited"
+            elif self.deadline is not None and monotonic() >= self.deadline:
+                self.exceeded = "time"
+            elif self.stop is not None and self.stop():
+                self.exceeded = "stopped"
+        if self.exceeded is not None:
+            self.cut_off = True
+            return []
+        ans = self._generate(puzzle, reverse)
+        if self.callback is not None:
+            self.callback(self, puzzle)
+        return ans
+
+    def _generate(self, puzzle: Puzzle, reverse: bool) -> List[Puzzle]:
+        """
+        Return the extensions, or reverse extensions if <reverse>, of
+        <puzzle> that do not fail fast, counting them.
+        """
+
+        if reverse:
+            extensions = puzzle.reverse_extensions()
+        else:
+            extensions = puzzle.extensions()
+        self.expanded += 1
+        self.generated += len(extensions)
+        ans = [x for x in extensions if not x.fail_fast()]
+        self.pruned += len(extensions) - len(ans)
+        return ans
+
+
+class TimedContext(SolverContext):
+    """
+    A SolverContext that also times the parts of the search it sees.
+    The timing costs a little on each call, so use it for profiling
+    rather than by default.
+
+    === Attributes ===
+    extensions_time: the seconds spent generating extensions and
+        pruning them, not counting callback
+    is_solved_time: the seconds spent checking for solutions
+    hashing_time: the seconds spent finding state keys, and for visit,
+        storing them
+    """
+    extensions_time: float
+    is_solved_time: float
+    hashing_time: float
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Create a new, empty TimedContext, with the budgets and callback
+        of SolverContext.
+        """
 
-seen = set()
-seen2 = set()
+        SolverContext.__init__(self, *args, **kwargs)
+        self.extensions_time = 0.0
+        self.is_solved_time = 0.0
+        self.hashing_time = 0.0
 
+    def _generate(self, puzzle: Puzzle, reverse: bool) -> List[Puzzle]:
+        """Generate as SolverContext does, timed into extensions_time."""
 
-def depth_first_solve(puzzle: Puzzle) -> PuzzleNode:
+        start = perf_counter()
+        ans = SolverContext._generate(self, puzzle, reverse)
+        self.extensions_time += perf_counter() - start
+        return ans
+
+    def visit(self, puzzle: Puzzle) -> bool:
+        """Visit as SolverContext does, timed into hashing_time."""
+
+        start = perf_counter()
+        ans = SolverContext.visit(self, puzzle)
+        self.hashing_time += perf_counter() - start
+        return ans
+
+    def is_solved(self, puzzle: Puzzle) -> bool:
+        """Return whether <puzzle> is solved, timed into is_solved_time."""
+
+        start = perf_counter()
+        ans = puzzle.is_solved()
+        self.is_solved_time += perf_counter() - start
+        return ans
+
+    def key(self, puzzle: Puzzle) -> Hashable:
+        """Return the state key of <puzzle>, timed into hashing_time."""
+
+        start = perf_counter()
+        ans = puzzle.state_key()
+        self.hashing_time += perf_counter() - start
+        return ans
+
+    def stats(self, memory: bool = False) -> Dict[str, Any]:
+        """
+        Return the counters and timings of this search, by name, with
+        "visited_bytes" if <memory>.
+        """
+
+        ans = SolverContext.stats(self, memory)
+        ans.update(extensions_time=self.extensions_time,
+                   is_solved_time=self.is_solved_time,
+                   hashing_time=self.hashing_time)
+        return ans
+
+
+def depth_first_solve(puzzle: Puzzle,
+                      context: Optional[SolverContext] = None,
+                      compact: bool = False,
+                      max_expansions: Optional[int] = None,
+                      timeout: Optional[float] = None,
+                      max_visited: Optional[int] = None) \
+        -> Union[PuzzleNode, MoveSequence, BudgetExceeded]:
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    The search keeps its visited states and counters in <context>, or in
+    a new SolverContext if none is given.  It uses an explicit stack
+    rather than recursion, so long paths need no raised recursion limit.
+
+    Return a BudgetExceeded instead if the search expands
+    <max_expansions> puzzles, runs for <timeout> seconds or visits
+    <max_visited> states, or runs out of a budget of <context>, before
+    it is done.
+
     idea website:
     https://stackoverflow.com/questions/43430309/depth-first-search-dfs-code-in-python
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> print(depth_first_solve(WordLadderPuzzle("mist", "case", ws),
+    ...                         max_expansions=2))
+    budget exceeded (expansions) after 2 expansions, 3 states visited
     """
-    # base case
-    if puzzle.is_solved():
-        return PuzzleNode(puzzle, None)
+    context = _budgeted(context, max_expansions, timeout, max_visited)
+    return _run(_depth_first_steps(puzzle, context, compact))
 
-    curr = PuzzleNode(puzzle, None)
 
-    for x in puzzle.extensions():  # puzzle.extensions() is a list
-        if x.__str__() in seen:
-            continue
-        else:
-            seen.add(x.__str__())
-            next = depth_first_solve(x)
-            if next is not None:
-                curr.parent = x
-                curr.children.append(next)
-                return curr
-    return None
+def _depth_first_steps(puzzle: Puzzle, context: SolverContext,
+                       compact: bool) -> Generator[None, None, Any]:
+    # The search of depth_first_solve, pausing after each expansion, and
+    # returning the solution.
+    if puzzle.fail_fast():
+        return None
+    context.visit(puzzle)
+
+    # base case
+    if context.is_solved(puzzle):
+        return _result([puzzle], compact)
+
+    # path[i] is the puzzle whose remaining extensions are in stack[i]
+    path = [puzzle]
+    stack = [iter(context.expand(puzzle))]
+    while stack:
+        for x in stack[-1]:
+            if context.visit(x):
+                path.append(x)
+                if context.is_solved(x):
+                    return _result(path, compact)
+                extensions = context.expand(x)
+                if context.cut_off:
+                    return _no_solution(context)
+                stack.append(iter(extensions))
+                context.frontier(len(path))
+                yield
+                break
+        else:  # every extension of path[-1] has been tried
+            stack.pop()
+            path.pop()
+    return _no_solution(context)
 
 
-def breadth_first_solve(puzzle: Puzzle) -> PuzzleNode:
+def breadth_first_solve(puzzle: Puzzle,
+                        context: Optional[SolverContext] = None,
+                        compact: bool = False,
+                        max_expansions: Optional[int] = None,
+                        timeout: Optional[float] = None,
+                        max_visited: Optional[int] = None) \
+        -> Union[PuzzleNode, MoveSequence, BudgetExceeded]:
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
+    The search keeps its visited states and counters in <context>, or in
+    a new SolverContext if none is given.  Each puzzle is kept once, when
+    it is first reached, with the index of the puzzle it was reached
+    from, so memory grows with the number of distinct states rather than
+    the number of extensions generated.
+
+    Return a BudgetExceeded instead if the search expands
+    <max_expansions> puzzles, runs for <timeout> seconds or visits
+    <max_visited> states, or runs out of a budget of <context>, before
+    it is done.  Every visited state is kept, so max_visited bounds the
+    memory the search uses.
+
     idea website:
     https://www.itread01.com/content/1542363063.html
     """
+    context = _budgeted(context, max_expansions, timeout, max_visited)
+    return _run(_breadth_first_steps(puzzle, context, compact))
+
+
+def _breadth_first_steps(puzzle: Puzzle, context: SolverContext,
+                         compact: bool) -> Generator[None, None, Any]:
+    # The search of breadth_first_solve, pausing after each expansion, and
+    # returning the solution.
+    if puzzle.fail_fast():
+        return None
+    context.visit(puzzle)
+
+    # base case
+    if context.is_solved(puzzle):
+        return _result([puzzle], compact)
+
+    # puzzles[i] was first reached from puzzles[parents[i]]; puzzles are
+    # added in the order they are reached, so the ones from head on are
+    # the queue still to be expanded
+    puzzles, parents = [puzzle], array("l", [-1])
+    head = 0
+    while head < len(puzzles):
+        extensions = context.expand(puzzles[head])
+        if context.cut_off:
+            return _no_solution(context)
+        for extension in extensions:
+            if context.visit(extension):
+                puzzles.append(extension)
+                parents.append(head)
+                if context.is_solved(extension):
+                    return _result(_trace(puzzles, parents,
+                                          len(puzzles) - 1), compact)
+        head += 1
+        context.frontier(len(puzzles) - head)
+        yield
+    return _no_solution(context)
+
+
+def bidirectional_solve(puzzle: Puzzle,
+                        context: Optional[SolverContext] = None,
+                        compact: bool = False) \
+        -> Union[PuzzleNode, MoveSequence]:
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    Breadth-first search from both <puzzle> and its goal, stepping back
+    from the goal with Puzzle.reverse_extensions and always growing the
+    smaller frontier by one level, until the two searches meet.  The path
+    found is a shortest one.  Puzzles without a goal are solved with
+    breadth_first_solve instead.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> print(bidirectional_solve(WordLadderPuzzle("cost", "case", ws)))
+    cost -> case
+    <BLANKLINE>
+    cast -> case
+    <BLANKLINE>
+    case -> case
+    <BLANKLINE>
+    <BLANKLINE>
+    >>> print(bidirectional_solve(WordLadderPuzzle("cost", "mast", ws)))
+    None
+    """
+    if context is None:
+        context = SolverContext()
+    if puzzle.fail_fast():
+        return None
+    goal = puzzle.goal()
+    if goal is None:
+        return breadth_first_solve(puzzle, context, compact)
+
     # base case
-    if puzzle.is_solved():
-        return PuzzleNode(puzzle, None)
+    if context.is_solved(puzzle):
+        return _result([puzzle], compact)
+
+    # sides[0] maps the key of each puzzle reached forwards from puzzle to
+    # (the puzzle, the key of the puzzle it was reached from, its depth);
+    # sides[1] does the same for puzzles reached backwards from goal
+    start_key, goal_key = context.key(puzzle), context.key(goal)
+    sides = ({start_key: (puzzle, None, 0)}, {goal_key: (goal, None, 0)})
+    frontiers = ([puzzle], [goal])
+    context.visited.update([start_key, goal_key])
+    meet = start_key if start_key == goal_key else None
+
+    while meet is None and frontiers[0] and frontiers[1]:
+        d = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen, other = sides[d], sides[1 - d]
+        layer = []
+        for x in frontiers[d]:
+            x_key = context.key(x)
+            depth = seen[x_key][2] + 1
+            for y in context.expand(x, d == 1):
+                key = context.key(y)
+                if key not in seen:
+                    seen[key] = (y, x_key, depth)
+                    context.visited.add(key)
+                    layer.append(y)
+                    if key in other and (
+                            meet is None or
+                            other[key][2] < other[meet][2]):
+                        meet = key
+                else:
+                    context.duplicates += 1
+        frontiers[d][:] = layer
+        context.frontier(len(frontiers[0]) + len(frontiers[1]))
+
+    if meet is None:  # the puzzle is unsolvable
+        return None
+    path, key = [], meet
+    while key is not None:
+        path.append(sides[0][key][0])
+        key = sides[0][key][1]
+    path.reverse()
+    key = sides[1][meet][1]
+    while key is not None:
+        path.append(sides[1][key][0])
+        key = sides[1][key][1]
+    return _result(path, compact)
 
-    curr = PuzzleNode(puzzle, None)
-    q = deque()
-    q.append(curr)
 
-    found = False
-    while len(q) != 0:
-        x = q.popleft()
-        if x.__str__() in seen2:
+def astar_solve(puzzle: Puzzle,
+                heuristic: Optional[Callable[[Puzzle], int]] = None,
+                context: Optional[SolverContext] = None,
+                compact: bool = False) -> Union[PuzzleNode, MoveSequence]:
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    Puzzles are expanded in order of their distance from <puzzle> plus
+    <heuristic> of them, which defaults to Puzzle.heuristic.  The path
+    is a shortest one whenever the heuristic never overestimates.
+
+    The frontier is a binary heap; a puzzle reached again by a shorter
+    path is pushed again and its older entry is skipped when popped.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "cose", "most", "mist"}
+    >>> print(astar_solve(WordLadderPuzzle("cost", "case", ws)))
+    cost -> case
+    <BLANKLINE>
+    cast -> case
+    <BLANKLINE>
+    case -> case
+    <BLANKLINE>
+    <BLANKLINE>
+    """
+    if context is None:
+        context = SolverContext()
+    if heuristic is None:
+        heuristic = _puzzle_heuristic
+    if puzzle.fail_fast():
+        return None
+
+    # puzzles[i] was reached in costs[i] steps from puzzles[parents[i]]
+    puzzles, parents, costs = [puzzle], [-1], [0]
+    best = {context.key(puzzle): 0}
+    heap = [(heuristic(puzzle), 0)]
+
+    while heap:
+        i = heappop(heap)[1]
+        x, cost = puzzles[i], costs[i]
+        key = context.key(x)
+        if best[key] < cost:  # a shorter path here was already expanded
             continue
-        else:
-            seen2.add(x.__str__())
-            if x.puzzle.is_solved():
-                found = True
+        context.visited.add(key)
+        if context.is_solved(x):
+            return _result(_trace(puzzles, parents, i), compact)
+        for extension in context.expand(x):
+            extension_key = context.key(extension)
+            if (extension_key not in best or
+                    cost + 1 < best[extension_key]):
+                best[extension_key] = cost + 1
+                heappush(heap, (cost + 1 + heuristic(extension),
+                                len(puzzles)))
+                puzzles.append(extension)
+                parents.append(i)
+                costs.append(cost + 1)
+            else:
+                context.duplicates += 1
+        context.frontier(len(heap))
+    return None
+
+
+def ida_star_solve(puzzle: Puzzle,
+                   heuristic: Optional[Callable[[Puzzle], int]] = None,
+                   context: Optional[SolverContext] = None,
+                   compact: bool = False) -> Union[PuzzleNode, MoveSequence]:
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    Iterative-deepening A*: repeat a depth-first search that gives up on
+    any puzzle whose distance from <puzzle> plus <heuristic> is above a
+    bound, raising the bound to the smallest value that was cut off each
+    time.  Only the current path is kept, so memory grows with the length
+    of the solution rather than the number of states, and no state on
+    the path (in particular the parent) is entered again.  <heuristic>
+    defaults to Puzzle.heuristic; the path is a shortest one whenever the
+    heuristic never overestimates.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "cose", "most", "mist"}
+    >>> print(ida_star_solve(WordLadderPuzzle("cost", "case", ws)))
+    cost -> case
+    <BLANKLINE>
+    cast -> case
+    <BLANKLINE>
+    case -> case
+    <BLANKLINE>
+    <BLANKLINE>
+    >>> print(ida_star_solve(WordLadderPuzzle("cost", "mast", ws)))
+    None
+    """
+    if context is None:
+        context = SolverContext()
+    if heuristic is None:
+        heuristic = _puzzle_heuristic
+    if puzzle.fail_fast():
+        return None
+
+    bound = heuristic(puzzle)
+    while bound is not None:
+        path, bound = _bounded_search(puzzle, bound, heuristic, context)
+        if path is not None:
+            return _result(path, compact)
+    return None
+
+
+def _bounded_search(puzzle: Puzzle, bound: int,
+                    heuristic: Callable[[Puzzle], int],
+                    context: SolverContext) \
+        -> Tuple[Optional[List[Puzzle]], Optional[int]]:
+    """
+    Return a path of puzzles from <puzzle> to a solution along which
+    distance plus <heuristic> never exceeds <bound>, or None, together
+    with the smallest such value above <bound> that was cut off, or None
+    if nothing was cut off.
+    """
+    next_bound = None
+    estimate = heuristic(puzzle)
+    if estimate > bound:
+        return None, estimate
+    if context.is_solved(puzzle):
+        return [puzzle], None
+
+    # path[i] is the puzzle whose remaining extensions are in stack[i]
+    path = [puzzle]
+    on_path = {context.key(puzzle)}
+    stack = [iter(context.expand(puzzle))]
+    while stack:
+        for x in stack[-1]:
+            key = context.key(x)
+            if key in on_path:
+                context.duplicates += 1
+                continue
+            estimate = len(path) + heuristic(x)
+            if estimate > bound:
+                if next_bound is None or estimate < next_bound:
+                    next_bound = estimate
+                continue
+            path.append(x)
+            if context.is_solved(x):
+                return path, None
+            on_path.add(key)
+            stack.append(iter(context.expand(x)))
+            context.frontier(len(path))
+            break
+        else:  # every extension of path[-1] has been tried
+            stack.pop()
+            on_path.discard(context.key(path.pop()))
+    return None, next_bound
+
+
+async def async_solve(puzzle: Puzzle,
+                      solver: Callable[..., Any] = depth_first_solve,
+                      every: int = 100, timeout: Optional[float] = None,
+                      context: Optional[SolverContext] = None,
+                      compact: bool = False) \
+        -> Union[PuzzleNode, MoveSequence]:
+    """
+    Return what <solver>, depth_first_solve or breadth_first_solve, does
+    for <puzzle>, but hand control back to the event loop after every
+    <every> expansions, so other tasks keep running during the search.
+
+    After <timeout> seconds, the search gives up and returns a
+    BudgetExceeded, like <solver> does when it runs out of a budget of
+    <context>.  When the task is cancelled, for instance by
+    asyncio.timeout or asyncio.wait_for, the search stops at its next
+    pause, sets cut_off, and lets CancelledError through.  Either way,
+    <context> keeps the counters of the search so far.
+
+    Raise ValueError if <solver> cannot be paused.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> solution = asyncio.run(async_solve(
+    ...     WordLadderPuzzle("mist", "case", ws), breadth_first_solve,
+    ...     every=1, compact=True))
+    >>> solution.moves
+    ['most', 'cost', 'cast', 'case']
+    """
+    if solver not in _STEPS:
+        raise ValueError("{} cannot be run by async_solve".format(
+            getattr(solver, "__name__", solver)))
+    context = _budgeted(context, None, timeout, None)
+    steps, count = _STEPS[solver](puzzle, context, compact), 0
+    try:
+        while True:
+            next(steps)
+            count += 1
+            if count % every == 0:
+                await asyncio.sleep(0)
+    except StopIteration as stopped:
+        return stopped.value
+    except asyncio.CancelledError:
+        context.exceeded, context.cut_off = "stopped", True
+        raise
+    finally:
+        steps.close()
+
+
+def _run(steps: Generator[None, None, Any]) -> Any:
+    """
+    Run the search <steps> without pausing, and return its result.
+    """
+    try:
+        while True:
+            next(steps)
+    except StopIteration as stopped:
+        return stopped.value
+
+
+def _budgeted(context: Optional[SolverContext],
+              max_expansions: Optional[int], timeout: Optional[float],
+              max_visited: Optional[int]) -> SolverContext:
+    """
+    Return <context>, or a new SolverContext if it is None, with the
+    budgets that are not None set.
+    """
+    if context is None:
+        context = SolverContext()
+    if max_expansions is not None:
+        context.max_expansions = max_expansions
+    if timeout is not None:
+        context.deadline = monotonic() + timeout
+    if max_visited is not None:
+        context.max_visited = max_visited
+    return context
+
+
+def _no_solution(context: SolverContext) -> Optional[BudgetExceeded]:
+    """
+    Return what a search with <context> that found no solution returns:
+    a BudgetExceeded if it was cut off, and otherwise None.
+    """
+    return BudgetExceeded(context) if context.cut_off else None
+
+
+# the searches of the solvers that async_solve can pause
+_STEPS = {depth_first_solve: _depth_first_steps,
+          breadth_first_solve: _breadth_first_steps}
+
+
+def parallel_solve(puzzle: Puzzle,
+                   solver: Callable[..., Any] = depth_first_solve,
+                   split_depth: int = 1, workers: Optional[int] = None,
+                   deterministic: bool = False,
+                   context: Optional[SolverContext] = None,
+                   compact: bool = False) \
+        -> Union[PuzzleNode, MoveSequence]:
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    The puzzles <split_depth> extensions away from <puzzle> are found
+    breadth-first, and <solver>, one of the solvers of this module, is
+    run from each of them in a pool of <workers> processes (by default,
+    one per CPU), so puzzles must be picklable.  Each part gets its own
+    SolverContext, seeded with the puzzles on the way to it.
+
+    Otherwise the first solution found wins, and the other parts are
+    stopped.  With <deterministic>, the solution of the first part, in
+    the order the parts were found, that has one wins, so the same
+    solution is returned every time; only the parts after it are
+    stopped early.
+
+    <context> keeps the visited states of the split and the counters of
+    the whole search.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> print(parallel_solve(WordLadderPuzzle("cost", "case", ws),
+    ...                      breadth_first_solve, workers=2,
+    ...                      deterministic=True))
+    cost -> case
+    <BLANKLINE>
+    cast -> case
+    <BLANKLINE>
+    case -> case
+    <BLANKLINE>
+    <BLANKLINE>
+    """
+    if context is None:
+        context = SolverContext()
+    if puzzle.fail_fast():
+        return None
+    context.visit(puzzle)
+    if context.is_solved(puzzle):
+        return _result([puzzle], compact)
+
+    # each path in paths leads from puzzle to a part to solve
+    paths = [[puzzle]]
+    for _ in range(split_depth):
+        layer = []
+        for path in paths:
+            for extension in context.expand(path[-1]):
+                if context.visit(extension):
+                    if context.is_solved(extension):
+                        return _result(path + [extension], compact)
+                    layer.append(path + [extension])
+        paths = layer
+    if not paths:
+        return None
+
+    # stops[i] is set once part i should give up; the flags are only
+    # written here, so they need no lock
+    stops = multiprocessing.Array("b", len(paths), lock=False)
+    results, best = [None] * len(paths), None
+    with ProcessPoolExecutor(workers, initializer=_init_part,
+                             initargs=(stops,)) as pool:
+        parts = [pool.submit(_solve_part, i, path[-1],
+                             [x.state_key() for x in path], solver)
+                 for i, path in enumerate(paths)]
+        pending = set(range(len(paths)))
+        for future in as_completed(parts):
+            if future.cancelled():
+                continue
+            i = parts.index(future)
+            pending.discard(i)
+            results[i], expanded, generated, pruned = future.result()
+            context.expanded += expanded
+            context.generated += generated
+            context.pruned += pruned
+            if results[i] is not None and (best is None or i < best):
+                best = i
+                for j in pending:
+                    if j > best or not deterministic:
+                        stops[j] = 1
+                        parts[j].cancel()
+            if best is not None and (not deterministic or
+                                     all(j > best for j in pending)):
                 break
-            for i in x.puzzle.extensions():
-                q.append(PuzzleNode(i, None, x))
 
-    if not found:  # the puzzle is unsolvable
+    if best is None:
         return None
-    else:
-        ans = None
-        while x:
-            ans = PuzzleNode(x.puzzle, children=[ans], parent=None)
-            if not ans.children[0] is None:
-                ans.children[0].parent = ans
-            else:
-                ans.children = []
-            x = x.parent
+    return _result(paths[best][:-1] + list(results[best].puzzles()),
+                   compact)
+
+
+def solve_many(puzzles: Iterable[Puzzle],
+               strategy: Callable[..., Any] = depth_first_solve,
+               workers: Optional[int] = None,
+               timeout: Optional[float] = None,
+               max_expansions: Optional[int] = None,
+               compact: bool = False) -> Iterator[SolveResult]:
+    """
+    Solve each of <puzzles> with <strategy>, one of the solvers of this
+    module, in a pool of <workers> processes (by default, one per CPU),
+    and yield a SolveResult for each puzzle as soon as it is done, in the
+    order they finish.
+
+    Each solve has its own SolverContext, so solves share no visited
+    states, and gives up once it has expanded <max_expansions> puzzles or
+    run for <timeout> seconds, whichever comes first.  The time limit is
+    checked before each expansion, so a single slow expansion can run
+    past it.
+
+    Puzzles are taken from <puzzles> only a few at a time, as workers
+    free up, so <puzzles> may be a long or endless iterator.  Closing the
+    generator early stops the solves still running.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> puzzles = [WordLadderPuzzle("cost", "case", ws),
+    ...            WordLadderPuzzle("mist", "cast", ws),
+    ...            WordLadderPuzzle("cost", "cure", ws)]
+    >>> results = sorted(solve_many(puzzles, breadth_first_solve, workers=2,
+    ...                             compact=True), key=lambda x: x.index)
+    >>> [x.solution.moves for x in results[:2]]
+    [['cast', 'case'], ['most', 'cost', 'cast']]
+    >>> results[2].solution is None, results[2].cut_off
+    (True, False)
+    """
+    workers = workers or os.cpu_count() or 1
+    # stop[0] is set once the caller stops asking for results
+    stop = multiprocessing.Array("b", 1, lock=False)
+    pool = ProcessPoolExecutor(workers, initializer=_init_part,
+                               initargs=(stop,))
+    puzzles, running = enumerate(puzzles), set()
+    try:
+        while True:
+            for future in _submit_batch(pool, puzzles, 2 * workers - len(
+                    running), strategy, timeout, max_expansions):
+                running.add(future)
+            if not running:
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _batch_result(future.result(), compact)
+    finally:
+        stop[0] = 1
+        pool.shutdown(cancel_futures=True)
+
+
+async def solve_many_async(puzzles: Iterable[Puzzle],
+                           strategy: Callable[..., Any] = depth_first_solve,
+                           workers: Optional[int] = None,
+                           timeout: Optional[float] = None,
+                           max_expansions: Optional[int] = None,
+                           compact: bool = False) \
+        -> AsyncIterator[SolveResult]:
+    """
+    Do what solve_many does, as an asynchronous iterator, so an event
+    loop keeps running other tasks while it waits for the workers.
+
+    Closing the iterator early, or cancelling the task using it, stops
+    the solves still running.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> puzzles = [WordLadderPuzzle("cost", "case", ws),
+    ...            WordLadderPuzzle("mist", "cast", ws)]
+    >>> async def collect():
+    ...     return [x async for x in solve_many_async(
+    ...         puzzles, breadth_first_solve, workers=2, compact=True)]
+    >>> results = sorted(asyncio.run(collect()), key=lambda x: x.index)
+    >>> [x.solution.moves for x in results]
+    [['cast', 'case'], ['most', 'cost', 'cast']]
+    """
+    workers = workers or os.cpu_count() or 1
+    # stop[0] is set once the caller stops asking for results
+    stop = multiprocessing.Array("b", 1, lock=False)
+    pool = ProcessPoolExecutor(workers, initializer=_init_part,
+                               initargs=(stop,))
+    puzzles, running = enumerate(puzzles), set()
+    try:
+        while True:
+            for future in _submit_batch(pool, puzzles, 2 * workers - len(
+                    running), strategy, timeout, max_expansions):
+                running.add(asyncio.wrap_future(future))
+            if not running:
+                return
+            done, running = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield _batch_result(future.result(), compact)
+    finally:
+        stop[0] = 1
+        # wait for the running solves to see the stop flag in a thread, so
+        # the event loop is not blocked meanwhile
+        await asyncio.to_thread(pool.shutdown, cancel_futures=True)
+
+
+def _submit_batch(pool: ProcessPoolExecutor,
+                  puzzles: Iterator[Tuple[int, Puzzle]], count: int,
+                  strategy: Callable[..., Any], timeout: Optional[float],
+                  max_expansions: Optional[int]) -> Iterator[Future]:
+    """
+    Submit up to <count> more of the numbered <puzzles> of a solve_many
+    to <pool>, yielding their futures.  solve_many keeps every worker
+    busy, with one puzzle queued behind it.
+    """
+    for i, puzzle in islice(puzzles, count):
+        yield pool.submit(_solve_one, i, puzzle, strategy, timeout,
+                          max_expansions)
+
+
+def _batch_result(result: SolveResult, compact: bool) -> SolveResult:
+    """
+    Return <result> from a worker of a solve_many, with its solution as
+    PuzzleNodes unless <compact>.
+    """
+    if not compact and result.solution is not None:
+        result.solution = result.solution.to_node()
+    return result
+
+
+# the stop flags of the parts of a parallel_solve, or the one stop flag
+# of a solve_many, in a worker process
+_stops = None
+
+
+def _init_part(stops: Any) -> None:
+    # Keep the stop flags shared with the process running a parallel_solve
+    # or solve_many.
+    global _stops
+    _stops = stops
+
+
+def _solve_part(i: int, puzzle: Puzzle, seen: List[Hashable],
+                solver: Callable[..., Any]) \
+        -> Tuple[Optional[MoveSequence], int, int, int]:
+    # Solve part i of a parallel_solve, from puzzle, with the puzzles with
+    # keys in seen already visited, until its stop flag is set.  Return
+    # the solution found and the expanded, generated and pruned counts.
+    context = SolverContext(stop=lambda: _stops[i] != 0)
+    context.visited.update(seen[:-1])
+    solution = solver(puzzle, context=context, compact=True)
+    if isinstance(solution, BudgetExceeded):
+        solution = None
+    return solution, context.expanded, context.generated, context.pruned
+
+
+def _solve_one(i: int, puzzle: Puzzle, strategy: Callable[..., Any],
+               timeout: Optional[float],
+               max_expansions: Optional[int]) -> SolveResult:
+    # Solve puzzle i of a solve_many, within its budgets.
+    start = monotonic()
+    context = SolverContext(max_expansions, lambda: _stops[0] != 0)
+    if timeout is not None:
+        context.deadline = start + timeout
+    solution = strategy(puzzle, context=context, compact=True)
+    if isinstance(solution, BudgetExceeded):
+        solution = None
+    return SolveResult(i, solution, context, monotonic() - start)
+
+
+def _puzzle_heuristic(puzzle: Puzzle) -> int:
+    # The default heuristic for astar_solve.
+    return puzzle.heuristic()
+
+
+def _trace(puzzles: List[Puzzle], parents: Sequence[int],
+           i: int) -> List[Puzzle]:
+    """
+    Return the path of puzzles from puzzles[0] to puzzles[i], where each
+    puzzle was reached from puzzles[parents[i]], and parents[0] is -1.
+
+    >>> _trace(["a", "b", "c", "d"], [-1, 0, 0, 2], 3)
+    ['a', 'c', 'd']
+    """
+    path = []
+    while i != -1:
+        path.append(puzzles[i])
+        i = parents[i]
+    path.reverse()
+    return path
+
+
+def _result(path: List[Puzzle], compact: bool) \
+        -> Union[PuzzleNode, MoveSequence]:
+    """
+    Return the solution through the puzzles in <path>: a MoveSequence if
+    <compact>, and otherwise a chain of PuzzleNodes.
+
+    Precondition: path is not empty
+    """
+    if compact:
+        return MoveSequence(path[0], [path[i].move_to(path[i + 1])
+                                      for i in range(len(path) - 1)])
+    return _build_path(path)
+
+
+def _build_path(path: List[Puzzle]) -> PuzzleNode:
+    """
+    Return the first of a chain of PuzzleNodes holding the puzzles in
+    <path>, in order, each node the only child of the one before it.
+
+    Precondition: path is not empty
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"on", "oo", "no"}
+    >>> node = _build_path([WordLadderPuzzle("on", "no", ws),
+    ...                     WordLadderPuzzle("oo", "no", ws)])
+    >>> print(node.children[0].parent.puzzle)
+    on -> no
+    >>> node.children[0].children
+    []
+    """
+    ans = PuzzleNode(path[0])
+    curr = ans
+    for puzzle in path[1:]:
+        child = PuzzleNode(puzzle, None, curr)
+        curr.children.append(child)
+        curr = child
+    return ans
+
+
+class MoveSequence:
+    """
+    A solution given as the puzzle it starts at and the codes, from
+    Puzzle.move_to, of the moves from there, rather than as a chain of
+    PuzzleNodes holding every puzzle along the way.
+
+    === Attributes ===
+    start: the puzzle the solution starts at
+    moves: the codes of the moves, in order
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case", "most", "mist"}
+    >>> solution = breadth_first_solve(WordLadderPuzzle("cost", "case", ws),
+    ...                                compact=True)
+    >>> solution.moves
+    ['cast', 'case']
+    >>> print(solution.final())
+    case -> case
+    """
+    start: Puzzle
+    moves: List[Hashable]
+
+    def __init__(self, start: Puzzle, moves: List[Hashable]) -> None:
+        """
+        Create a new MoveSequence of <moves> from <start>.
+        """
+
+        self.start, self.moves = start, moves
+
+    def __eq__(self, other: Union[MoveSequence, Any]) -> bool:
+        return (type(other) == type(self) and self.start == other.start and
+                self.moves == other.moves)
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __str__(self) -> str:
+        return "{}\n\n{} moves: {}".format(self.start, len(self.moves),
+                                           self.moves)
+
+    def puzzles(self) -> Iterator[Puzzle]:
+        """
+        Yield the puzzles of this solution, from start, replaying the
+        moves one at a time.
+        """
+
+        return replay(self.start, self.moves)
+
+    def final(self) -> Puzzle:
+        """
+        Return the puzzle this solution ends at.
+        """
+
+        ans = self.start
+        for ans in self.puzzles():
+            pass
         return ans
 
+    def to_node(self) -> PuzzleNode:
+        """
+        Return this solution as a chain of PuzzleNodes, like the ones the
+        solvers return without compact.
+        """
+
+        return _build_path(list(self.puzzles()))
+
+
+def replay(start: Puzzle, moves: Iterable[Hashable]) -> Iterator[Puzzle]:
+    """
+    Yield <start> and then the puzzle after each of <moves>, codes from
+    Puzzle.move_to, in turn.
+
+    Raise ValueError when a move is not a move from the puzzle before it.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "cast", "case"}
+    >>> [str(x) for x in replay(WordLadderPuzzle("cost", "case", ws),
+    ...                         ["cast", "case"])]
+    ['cost -> case', 'cast -> case', 'case -> case']
+    """
+    yield start
+    for move in moves:
+        start = start.apply_move(move)
+        yield start
+
+
+class BudgetExceeded:
+    """
+    What depth_first_solve and breadth_first_solve return in place of
+    None when a budget runs out before they find a solution or show that
+    there is none.
+
+    === Attributes ===
+    reason: which budget ran out: "expansions", "visited", "time" or
+        "stopped"
+    expanded: the number of puzzles expanded
+    generated: the number of extensions generated
+    visited: the number of states visited
+    """
+    reason: str
+    expanded: int
+    generated: int
+    visited: int
+
+    def __init__(self, context: SolverContext) -> None:
+        """
+        Create a new BudgetExceeded for the search cut off with
+        <context>.
+        """
+
+        self.reason = context.exceeded
+        self.expanded, self.generated = context.expanded, context.generated
+        self.visited = len(context.visited)
+
+    def __str__(self) -> str:
+        return "budget exceeded ({}) after {} expansions, {} states " \
+               "visited".format(self.reason, self.expanded, self.visited)
+
+
+class SolveResult:
+    """
+    The outcome of one solve of a solve_many.
+
+    === Attributes ===
+    index: the position of the puzzle among the puzzles given
+    solution: the solution found, or None
+    expanded: the number of puzzles expanded
+    generated: the number of extensions generated
+    pruned: the number of extensions dropped because they fail fast
+    cut_off: whether the solve gave up at its node or time budget, so a
+        None solution does not mean there is none
+    seconds: how long the solve took
+    """
+    index: int
+    solution: Optional[Union[PuzzleNode, MoveSequence]]
+    expanded: int
+    generated: int
+    pruned: int
+    cut_off: bool
+    seconds: float
+
+    def __init__(self, index: int,
+                 solution: Optional[Union[PuzzleNode, MoveSequence]],
+                 context: SolverContext, seconds: float) -> None:
+        """
+        Create a new SolveResult of puzzle <index>, with <solution> and
+        the counters of <context>, taking <seconds>.
+        """
+
+        self.index, self.solution, self.seconds = index, solution, seconds
+        self.expanded, self.generated = context.expanded, context.generated
+        self.pruned, self.cut_off = context.pruned, context.cut_off
+
 
 # The following class has been completed for you
 # Do NOT change anything provided in the class below
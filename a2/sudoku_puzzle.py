@@ -12,34 +12,65 @@ This module contains the class required to solve sudoku puzzles.
 """
 
 from __future__ import annotations
-from typing import List, Set, Union, Any
+from typing import List, Set, Union, Any, Dict, Tuple, Optional
 from puzzle import Puzzle
+from puzzle_tools import PuzzleNode
+from exact_cover import exact_cover
+from functools import lru_cache
 
 
 class SudokuPuzzle(Puzzle):
     """
     A sudoku puzzle that may be solved, unsolved, or even unsolvable.
 
+    A SudokuPuzzle is immutable.  Its grid is a tuple of rows of bytes,
+    one code per position, and its extensions share every row they do
+    not change with it, so that many of them can be stored at once.
+
     === Public Attributes ===
     None
 
     === Private Attributes ===
     _n: The number of rows/columns in this puzzle's grid
-    _symbols: All the symbols filled in so far in this puzzle; each sublist
-              represents one row of symbols filled in
-    _symbol_set: The set of all symbols that each row/column/subsquare must
-                 have exactly one of, for this puzzle to be solved
+    _grid: _grid[r][c] is the code, in _table, of the symbol at (r, c)
+    _table: the symbol table shared by every SudokuPuzzle with the same
+            symbol set
+    _mrv: whether extensions branch on the empty position with the fewest
+          allowed symbols, rather than the first empty position
+    _fewest: the empty position with the fewest allowed symbols, if known
+    _clash: whether some symbol appears twice in a row, column or
+            subsquare, or some position holds a symbol not in the
+            symbol set
+    _settled: whether naked and hidden singles have been filled in until
+              every empty position, and every symbol missing from a row,
+              column or subsquare, had somewhere to go
+    _hash: the hash of _grid, once it has been needed
 
     === Representation Invariants ===
-    _n: is a positive integer
-
+    _n: is a positive integer, less than 255
+    _grid has _n rows of _n codes each
     """
-
-    def __init__(self, n: int, symbols: List[List[str]], symbol_set: Set[str]):
+    __slots__ = ("_n", "_grid", "_table", "_mrv", "_fewest", "_clash",
+                 "_settled", "_hash")
+    _n: int
+    _grid: Tuple[bytes, ...]
+    _table: _SymbolTable
+    _mrv: bool
+    _fewest: Optional[Tuple[int, int]]
+    _clash: bool
+    _settled: bool
+    _hash: Optional[int]
+
+    def __init__(self, n: int, symbols: List[List[str]], symbol_set: Set[str],
+                 mrv: bool = False):
         """
         Create a new nxn SudokuPuzzle with symbols
         from symbol_set already selected.
 
+        If mrv is True, this puzzle and its extensions branch on the
+        empty position with the fewest allowed symbols (minimum remaining
+        values), rather than the first empty position.
+
         Note:
             Grid symbols are represented as letters or numerals
             The empty space is represented as a "*"
@@ -49,12 +80,34 @@ class SudokuPuzzle(Puzzle):
         - there are n symbols in the given symbol_set
         - there are n lists in symbols, and each list has n strings
         """
+        others = frozenset(x for row in symbols for x in row
+                           if x != "*" and x not in symbol_set)
+        table = _symbol_table(frozenset(symbol_set), others)
+        codes = table.codes
+        self._n, self._table, self._mrv = n, table, mrv
+        self._grid = tuple(bytes(codes[x] for x in row) for row in symbols)
+        self._fewest, self._settled, self._hash = None, False, None
+        self._clash = bool(others) or _Scratch(self).clash
+
+    @property
+    def _symbols(self) -> List[List[str]]:
+        """
+        Return all the symbols filled in so far in this puzzle, as a new
+        list with one sublist of symbols per row.
 
-        _n: int
-        _symbols: List[List[str]]
-        _symbol_set: Set[str]
+        >>> SudokuPuzzle(1, [["*"]], {"A"})._symbols
+        [['*']]
+        """
+        symbols = self._table.symbols
+        return [[symbols[code] for code in row] for row in self._grid]
 
-        self._n, self._symbols, self._symbol_set = n, symbols, symbol_set
+    @property
+    def _symbol_set(self) -> Set[str]:
+        """
+        Return the set of all symbols that each row/column/subsquare must
+        have exactly one of, for this puzzle to be solved.
+        """
+        return self._table.symbol_set
 
     def __eq__(self, other: Union[SudokuPuzzle, Any]) -> bool:
         """
@@ -81,9 +134,29 @@ class SudokuPuzzle(Puzzle):
         False
         """
 
-        return (type(other) == type(self) and
-                self._n == other._n and self._symbols == other._symbols and
-                self._symbol_set == other._symbol_set)
+        return (type(other) == type(self) and self._n == other._n and
+                self._table == other._table and self._grid == other._grid)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self._grid)
+        return self._hash
+
+    def state_key(self) -> bytes:
+        """
+        Return the codes of the symbols of this SudokuPuzzle joined into
+        one bytes object, row by row, with 0 for an empty position.
+
+        >>> r1 = ["A", "B", "C", "D"]
+        >>> r2 = ["D", "C", "B", "A"]
+        >>> r3 = ["*", "D", "*", "*"]
+        >>> r4 = ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, [r1, r2, r3, r4], {"A", "B", "C", "D"})
+        >>> list(s.state_key())
+        [1, 2, 3, 4, 4, 3, 2, 1, 0, 4, 0, 0, 0, 0, 0, 0]
+        """
+
+        return b"".join(self._grid)
 
     def __str__(self) -> str:
         """
@@ -120,10 +193,11 @@ class SudokuPuzzle(Puzzle):
         s = ''
         num = round(self._n ** (1 / 2))
         div = "-" * (self._n + 1) + "\n"
-        for i in range(len(self._symbols)):
+        symbols = self._symbols
+        for i in range(len(symbols)):
             if i > 0 and i % num == 0:
                 s += div
-            s += row_pickets(self._symbols[i])
+            s += row_pickets(symbols[i])
             s += "\n"
         return s.rstrip()
 
@@ -147,16 +221,9 @@ class SudokuPuzzle(Puzzle):
         False
         """
 
-        # temporary variables to give convenient names to each attribute
-        n, symbols = self._n, self._symbols
-
-        # check that there is no "*" left and
-        # all rows, column, subsquares have correct symbols
-        return (not any("*" in row for row in symbols)) \
-               and all([(self._row_set(i) == self._symbol_set and
-                      self._column_set(j) == self._symbol_set and
-                      self._subsquare_set(i, j) ==
-                      self._symbol_set) for i in range(n) for j in range(n)])
+        # check that there is no "*" left and no symbol repeats in a
+        # row, column or subsquare, so all of them have all n symbols
+        return not self._clash and not any(0 in row for row in self._grid)
 
     def extensions(self) -> List[SudokuPuzzle]:
         """
@@ -179,45 +246,205 @@ class SudokuPuzzle(Puzzle):
         True
         """
 
-        # temporary variables to give convenient names to each attribute
-        # symbols = All the symbols filled in so far in this puzzle;
-        #           each sublist represents one row of symbols filled in
-        symbols, symbol_set, n = self._symbols, self._symbol_set, self._n
-        if not any("*" in row for row in symbols):
+        if not any(0 in row for row in self._grid):
             return []
         else:
-            # get position of first empty position
+            scratch = _Scratch(self)
+            r, c = self._branch_position(scratch)
+
+            # list of SudokuPuzzles with each legal symbol at position (r, c),
+            # and whatever that forces, leaving out those found to be stuck
+            return_lst = []
+            allowed = scratch.allowed(r, c)
+            for code in range(1, self._n + 1):
+                if allowed & (1 << (code - 1)):
+                    new_puzzle = scratch.assign(r, c, code)
+                    if new_puzzle is not None:
+                        return_lst.append(new_puzzle)
+            return return_lst
+
+    def move_to(self, extension: SudokuPuzzle) -> Tuple[int, int, str]:
+        """
+        Return the position extensions fill in, and the symbol <extension>
+        has there, as the code of the move to it.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", "A", "B"],
+        ...                      ["B", "A", "D", "C"], ["D", "C", "B", "*"]],
+        ...                  {"A", "B", "C", "D"})
+        >>> s.move_to(s.extensions()[0])
+        (3, 3, 'A')
+        """
+        r, c = self._branch_position()
+        return r, c, self._table.symbols[extension._grid[r][c]]
+
+    def apply_move(self, move: Tuple[int, int, str]) -> SudokuPuzzle:
+        """
+        Return the extension of this SudokuPuzzle with the symbol move[2]
+        at the position (move[0], move[1]) extensions fill in.
+
+        Raise ValueError if that is not an extension.
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "C", "D"], ["C", "D", "A", "B"],
+        ...                      ["B", "A", "D", "C"], ["D", "C", "B", "*"]],
+        ...                  {"A", "B", "C", "D"})
+        >>> s.apply_move((3, 3, "A")).is_solved()
+        True
+        >>> s.apply_move((3, 3, "B"))
+        Traceback (most recent call last):
+        ...
+        ValueError: (3, 3, 'B') is not a move from this SudokuPuzzle
+        """
+        r, c, symbol = move
+        ans = None
+        if any(0 in row for row in self._grid) and \
+                (r, c) == self._branch_position() and \
+                symbol in self._symbol_set and \
+                self._allowed(r, c) >> (self._table.codes[symbol] - 1) & 1:
+            ans = self._assign(r, c, symbol)
+        if ans is None:
+            raise ValueError("{} is not a move from this "
+                             "SudokuPuzzle".format(move))
+        return ans
+
+    def _branch_position(self, scratch: Optional[_Scratch] = None) \
+            -> Tuple[int, int]:
+        """
+        Return the empty position that extensions fill in: the first one,
+        or with mrv, the one with the fewest allowed symbols.  <scratch>,
+        if given, is a _Scratch of this SudokuPuzzle.
+
+        Precondition: some position is empty
+
+        >>> grid = [["*", "*", "*", "*"], ["*", "*", "B", "*"],
+        ...         ["*", "*", "*", "*"], ["*", "C", "*", "*"]]
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"})._branch_position()
+        (0, 0)
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"},
+        ...              mrv=True)._branch_position()
+        (1, 1)
+        """
+        grid = self._grid
+        if not self._mrv:
             r = 0  # row with first empty position
-            while "*" not in symbols[r]:
+            while 0 not in grid[r]:
                 r += 1
-            c = symbols[r].index("*") # column with first empty position
+            return r, grid[r].index(0)
+        if self._fewest is None:
+            if scratch is None:
+                scratch = _Scratch(self)
+            fewest = self._n + 1
+            for (r, c, b) in _cells(self._n):
+                if grid[r][c] == 0:
+                    count = bin(scratch.allowed(r, c)).count("1")
+                    if count < fewest:
+                        fewest, self._fewest = count, (r, c)
+        return self._fewest
+
+    def _allowed(self, r: int, c: int) -> int:
+        """
+        Return the bits of the symbols that may still be put at (r, c),
+        where the i-th symbol in sorted order has bit 1 << i.
+
+        >>> s = SudokuPuzzle(4, [["A", "*", "*", "*"], ["*", "*", "B", "*"],
+        ...                      ["*", "*", "*", "*"], ["*", "C", "*", "*"]],
+        ...                  {"A", "B", "C", "D"})
+        >>> bin(s._allowed(0, 1))
+        '0b1010'
+        """
+        return _Scratch(self).allowed(r, c)
 
-            # allowed symbols at position (r, c)
-            # A | B == A.union(B)
-            allowed_symbols = (self._symbol_set -
-                               (self._row_set(r) |
-                                self._column_set(c) |
-                                self._subsquare_set(r, c)))
+    def _assign(self, r: int, c: int, symbol: str) -> Optional[SudokuPuzzle]:
+        """
+        Return a copy of this SudokuPuzzle with <symbol> at (r, c), and
+        every symbol that forces filled in as well, or None if that leaves
+        an empty position or a missing symbol with nowhere to go.
+
+        A symbol is forced into a position when it is the only one allowed
+        there (a naked single), or when the position is the only one in a
+        row, column or subsquare where the symbol is allowed (a hidden
+        single).
+
+        >>> s = SudokuPuzzle(4, [["A", "B", "*", "*"], ["*", "*", "*", "*"],
+        ...                      ["*", "*", "*", "*"], ["*", "*", "*", "*"]],
+        ...                  {"A", "B", "C", "D"})
+        >>> print(s._assign(0, 2, "C"))
+        AB|CD
+        **|**
+        -----
+        **|**
+        **|**
+        >>> print(s._assign(0, 2, "A"))
+        None
+        >>> s._assign(0, 2, "C")._grid[1] is s._grid[1]
+        True
+        """
+        return _Scratch(self).assign(r, c, self._table.codes[symbol])
 
-            # list of SudokuPuzzles with each legal digit at position i
-            return_lst = []
-            for symbol in allowed_symbols:
-                new_puzzle = SudokuPuzzle(n, symbols[:r] +
-                                          [symbols[r][:c] + [symbol] +
-                                           symbols[r][c+1:]] +
-                                          symbols[r+1:], symbol_set)
-                return_lst.append(new_puzzle)
-            return return_lst
+    def solution(self) -> Optional[SudokuPuzzle]:
+        """
+        Return this SudokuPuzzle with every empty position filled in so
+        that it is solved, or None if that is not possible.
+
+        The grid is solved as an exact cover problem with dancing links,
+        which copes with 16x16 and 25x25 grids far better than searching
+        through extensions.
 
-    def fail_fast(self):
+        >>> s = SudokuPuzzle(4, [["A", "*", "*", "*"], ["*", "*", "B", "*"],
+        ...                      ["*", "*", "*", "*"], ["*", "C", "*", "*"]],
+        ...                  {"A", "B", "C", "D"})
+        >>> print(s.solution())
+        AB|CD
+        CD|BA
+        -----
+        BA|DC
+        DC|AB
+        >>> s = SudokuPuzzle(4, [["A", "A", "*", "*"], ["*", "*", "*", "*"],
+        ...                      ["*", "*", "*", "*"], ["*", "*", "*", "*"]],
+        ...                  {"A", "B", "C", "D"})
+        >>> print(s.solution())
+        None
+        """
+        # row ((r * n) + c) * n + d puts the symbol with code d + 1 at
+        # (r, c), and covers the position, and that symbol in the row,
+        # column and subsquare of the position
+        n, grid = self._n, self._grid
+        rows, chosen = [], []
+        for (r, c, b) in _cells(n):
+            for d in range(n):
+                rows.append([r * n + c, n * n + r * n + d,
+                             2 * n * n + c * n + d, 3 * n * n + b * n + d])
+            if grid[r][c] > n:
+                return None
+            if grid[r][c] != 0:
+                chosen.append((r * n + c) * n + grid[r][c] - 1)
+        cover = exact_cover(4 * n * n, rows, chosen)
+        if cover is None:
+            return None
+        codes = [bytearray(n) for _ in range(n)]
+        for i in cover:
+            codes[i // (n * n)][i // n % n] = i % n + 1
+        return self._with_grid(tuple(bytes(row) for row in codes))
+
+    def _with_grid(self, grid: Tuple[bytes, ...]) -> SudokuPuzzle:
         """
-        Return whether some unfilled position has no allowable symbols
-        remaining to choose from, and hence this SudokoPuzzle can never
-        be completed.
+        Return a SudokuPuzzle like this one, but with <grid>, which has no
+        symbol repeated in a row, column or subsquare.
+        """
+        ans = object.__new__(SudokuPuzzle)
+        ans._n, ans._grid, ans._table = self._n, grid, self._table
+        ans._mrv, ans._fewest, ans._hash = self._mrv, None, None
+        ans._clash, ans._settled = False, False
+        return ans
+
+    def fail_fast(self) -> bool:
+        """
+        Return whether this SudokuPuzzle can never be completed: some
+        symbol appears twice in a row, column or subsquare, some empty
+        position has no allowed symbol left once its row, column and
+        subsquare are taken into account, or some symbol missing from a
+        row, column or subsquare is allowed in none of its empty positions.
 
-        return True where there is at least one empty position that will be
-        impossible to fill because the set of symbols has been completely used
-        up by other positions in the same row, column or subsquare
+        A solved SudokuPuzzle does not fail fast.
 
         >>> s = SudokuPuzzle(4, \
         [["A", "B", "C", "D"], \
@@ -240,54 +467,323 @@ class SudokuPuzzle(Puzzle):
         ["1", "2", "3", "4"]], {"1", "2", "3", "4"})
         >>> l1.fail_fast()
         True
+        >>> s = SudokuPuzzle(4, \
+        [["A", "*", "*", "*"], \
+        ["*", "*", "*", "*"], \
+        ["*", "*", "*", "*"], \
+        ["*", "A", "*", "*"]], {"A", "B", "C", "D"})
+        >>> s.fail_fast()
+        False
+        >>> s = SudokuPuzzle(4, \
+        [["*", "*", "*", "*"], \
+        ["*", "*", "*", "*"], \
+        ["*", "*", "B", "C"], \
+        ["*", "A", "*", "*"]], {"A", "B", "C", "D"})
+        >>> s.fail_fast()
+        True
         """
-        count = 0
-        for i in range(self._n):
-            for j in range(len(self._symbols[i])):
-                if self._symbols[i][j] == "*":
-                    count += 1
-                    x = self._row_set(i)
-                    x.update(self._column_set(j))
-                    x.remove('*')
-                    if x == self._symbol_set:
-                        return True
-        if count == 0:
+        if self._clash:
             return True
+        if self._settled:
+            # propagation already found every empty position and every
+            # missing symbol somewhere to go
+            return False
+        return _Scratch(self).stuck()
+
+
+class _Scratch:
+    """
+    A mutable copy of the grid of a SudokuPuzzle, with bit masks of the
+    symbols in each row, column and subsquare, for filling in positions.
+
+    Rows are copied into a bytearray only when they are first written
+    to, so the SudokuPuzzle made at the end shares the rest with the
+    one the _Scratch was made from.
+
+    === Attributes ===
+    puzzle: the SudokuPuzzle this _Scratch was made from
+    grid: the rows of the grid, as bytes, or bytearray once written to
+    written: the indices of the rows that are bytearrays
+    rows: rows[r] has the bits of the symbols filled in so far in row r,
+          where the symbol with code d has bit 1 << (d - 1)
+    columns: columns[c] has the bits of the symbols in column c
+    boxes: boxes[b] has the bits of the symbols in subsquare b, where
+           subsquares are numbered in row major order
+    clash: whether some symbol appears twice in a row, column or
+           subsquare
+    fewest: with mrv, the empty position with the fewest allowed symbols
+            seen in the last pass of propagate
+    """
+    __slots__ = ("puzzle", "grid", "written", "rows", "columns", "boxes",
+                 "clash", "fewest")
+    puzzle: SudokuPuzzle
+    grid: List[Union[bytes, bytearray]]
+    written: Set[int]
+    rows: List[int]
+    columns: List[int]
+    boxes: List[int]
+    clash: bool
+    fewest: Optional[Tuple[int, int]]
+
+    def __init__(self, puzzle: SudokuPuzzle) -> None:
+        """
+        Make a _Scratch copy of <puzzle>.
+        """
+        n = puzzle._n
+        self.puzzle, self.grid, self.written = puzzle, list(puzzle._grid), set()
+        self.rows, self.columns, self.boxes = [0] * n, [0] * n, [0] * n
+        self.clash, self.fewest = False, None
+        for (r, c, b) in _cells(n):
+            code = self.grid[r][c]
+            if code:
+                bit = (1 << (code - 1)) & ((1 << n) - 1)
+                if bit & (self.rows[r] | self.columns[c] | self.boxes[b]):
+                    self.clash = True
+                self.rows[r] |= bit
+                self.columns[c] |= bit
+                self.boxes[b] |= bit
+
+    def allowed(self, r: int, c: int) -> int:
+        """
+        Return the bits of the symbols that may still be put at (r, c).
+        """
+        n = self.puzzle._n
+        ss = round(n ** (1 / 2))
+        return ((1 << n) - 1) & ~(self.rows[r] | self.columns[c] |
+                                  self.boxes[(r // ss) * ss + c // ss])
+
+    def assign(self, r: int, c: int, code: int) -> Optional[SudokuPuzzle]:
+        """
+        Return the SudokuPuzzle made by putting the symbol with <code> at
+        (r, c), which is empty, and filling in everything that forces, or
+        None if that leaves something with nowhere to go.  This _Scratch
+        is left as it was.
+        """
+        work = object.__new__(_Scratch)
+        work.puzzle, work.grid, work.written = self.puzzle, self.grid[:], set()
+        work.rows, work.columns = self.rows[:], self.columns[:]
+        work.boxes, work.clash, work.fewest = self.boxes[:], self.clash, None
+        work.place(r, c, code)
+        if not work.propagate():
+            return None
+        puzzle = self.puzzle
+        for i in work.written:
+            work.grid[i] = bytes(work.grid[i])
+        ans = puzzle._with_grid(tuple(work.grid))
+        ans._clash, ans._settled = puzzle._clash, True
+        ans._fewest = work.fewest
+        return ans
+
+    def place(self, r: int, c: int, code: int) -> None:
+        """
+        Put the symbol with <code> at (r, c), which is empty, updating
+        the masks.
+        """
+        ss = round(self.puzzle._n ** (1 / 2))
+        bit = 1 << (code - 1)
+        if r not in self.written:
+            self.grid[r] = bytearray(self.grid[r])
+            self.written.add(r)
+        self.grid[r][c] = code
+        self.rows[r] |= bit
+        self.columns[c] |= bit
+        self.boxes[(r // ss) * ss + c // ss] |= bit
+
+    def propagate(self) -> bool:
+        """
+        Fill in naked and hidden singles until there are none left.
+        Return False if some empty position has no allowed symbol, or
+        some unit has a missing symbol that is allowed nowhere in it.
+        With mrv, also note the empty position with the fewest allowed
+        symbols seen in the last pass.
+        """
+        n, grid, mrv = self.puzzle._n, self.grid, self.puzzle._mrv
+        full = (1 << n) - 1
+        rows, columns, boxes = self.rows, self.columns, self.boxes
+        changed = True
+        while changed:
+            changed = False
+            fewest = n + 1
+            for (r, c, b) in _cells(n):
+                if grid[r][c] == 0:
+                    allowed = full & ~(rows[r] | columns[c] | boxes[b])
+                    if not allowed:
+                        return False
+                    if not allowed & (allowed - 1):
+                        self.place(r, c, allowed.bit_length())
+                        changed = True
+                    elif mrv:
+                        count = bin(allowed).count("1")
+                        if count < fewest:
+                            fewest, self.fewest = count, (r, c)
+            masks = (rows, columns, boxes)
+            for (kind, i, unit) in _units(n):
+                # bits allowed in at least one, and in at least two,
+                # empty positions of this unit
+                once, twice = 0, 0
+                for (r, c, b) in unit:
+                    if grid[r][c] == 0:
+                        allowed = full & ~(rows[r] | columns[c] | boxes[b])
+                        twice |= once & allowed
+                        once |= allowed
+                missing = full & ~masks[kind][i]
+                if missing & ~once:
+                    return False
+                singles = missing & ~twice
+                for (r, c, b) in unit:
+                    if singles and grid[r][c] == 0:
+                        allowed = singles & ~(rows[r] | columns[c] |
+                                              boxes[b])
+                        if allowed & (allowed - 1):
+                            return False
+                        if allowed:
+                            self.place(r, c, allowed.bit_length())
+                            singles &= ~allowed
+                            changed = True
+        return True
+
+    def stuck(self) -> bool:
+        """
+        Return whether some empty position has no allowed symbol, or some
+        unit has a missing symbol that is allowed nowhere in it.
+        """
+        n, grid = self.puzzle._n, self.grid
+        full = (1 << n) - 1
+        masks = (self.rows, self.columns, self.boxes)
+        for (kind, i, unit) in _units(n):
+            # bits allowed in at least one empty position of this unit
+            once = 0
+            for (r, c, b) in unit:
+                if grid[r][c] == 0:
+                    allowed = full & ~(self.rows[r] | self.columns[c] |
+                                       self.boxes[b])
+                    if not allowed:
+                        return True
+                    once |= allowed
+            if full & ~masks[kind][i] & ~once:
+                return True
         return False
 
-    # some private helper methods (note the private docstrings for each of them)
-    def _row_set(self, r: int) -> Set[str]:
-        # Return set of symbols in row of SudokuPuzzle self's symbols
-        # where position m occurs.
 
-        # set of elements from symbols[r]
-        return set(self._symbols[r])
+def exact_cover_solve(puzzle: SudokuPuzzle) -> Optional[PuzzleNode]:
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    the solution found by puzzle.solution(), with each child containing
+    the extension of the puzzle in its parent that agrees with the
+    solution, or None if puzzle cannot be solved.
+
+    >>> s = SudokuPuzzle(4, [["A", "*", "C", "D"], ["C", "D", "A", "B"],
+    ...                      ["B", "A", "D", "C"], ["D", "C", "*", "*"]],
+    ...                  {"A", "B", "C", "D"})
+    >>> node = exact_cover_solve(s).children[0]
+    >>> node.puzzle in s.extensions()
+    True
+    >>> print(node.puzzle)
+    AB|CD
+    CD|AB
+    -----
+    BA|DC
+    DC|BA
+    """
+    solved = puzzle.solution()
+    if solved is None:
+        return None
+    ans = PuzzleNode(puzzle)
+    curr, symbols = ans, puzzle._table.symbols
+    while any(0 in row for row in curr.puzzle._grid):
+        r, c = curr.puzzle._branch_position()
+        child = PuzzleNode(curr.puzzle.apply_move(
+            (r, c, symbols[solved._grid[r][c]])), None, curr)
+        curr.children.append(child)
+        curr = child
+    return ans
+
+
+class _SymbolTable:
+    """
+    The symbols of a SudokuPuzzle and their codes, shared by every
+    SudokuPuzzle with the same symbols.
+
+    === Attributes ===
+    symbol_set: the set of symbols each row/column/subsquare must have
+                exactly one of
+    symbols: symbols[d] is the symbol with code d: "*" has code 0, the
+             symbols of symbol_set have codes 1 .. len(symbol_set) in
+             sorted order, and any other symbols come after
+    codes: maps each symbol to its code
+    """
+    symbol_set: frozenset
+    symbols: Tuple[str, ...]
+    codes: Dict[str, int]
 
-    def _column_set(self, c: int) -> Set[str]:
-        # Return set of symbols in column of SudokuPuzzle self's symbols
-        # where position m occurs.
+    def __init__(self, symbol_set: frozenset, others: frozenset) -> None:
+        """
+        Create a _SymbolTable for the symbols of <symbol_set>, and <others>
+        that are not in it.
+        """
+        self.symbol_set = symbol_set
+        self.symbols = ("*",) + tuple(sorted(symbol_set)) + \
+            tuple(sorted(others))
+        self.codes = {symbol: d for d, symbol in enumerate(self.symbols)}
+
+    def __reduce__(self):
+        # unpickle as the shared table for these symbols
+        return _symbol_table, (self.symbol_set, frozenset(
+            self.symbols[len(self.symbol_set) + 1:]))
+
+    def __eq__(self, other: Union[_SymbolTable, Any]) -> bool:
+        # compare symbols, not identity: threads that miss the cache of
+        # _symbol_table at the same time each build their own table
+        return self is other or (
+            type(other) == type(self) and
+            self.symbol_set == other.symbol_set and
+            self.symbols == other.symbols)
+
+    def __hash__(self) -> int:
+        return hash(self.symbols)
+
+
+@lru_cache(maxsize=None)
+def _symbol_table(symbol_set: frozenset,
+                  others: frozenset = frozenset()) -> _SymbolTable:
+    """
+    Return the shared _SymbolTable for <symbol_set> and <others>.
 
-        # set of elements from symbols[0][c], symbols[1][c],
-        # ... symbols[len(symbols)-1][c]
-        return set([row[c] for row in self._symbols])
+    >>> _symbol_table(frozenset({"B", "A", "C"})).codes
+    {'*': 0, 'A': 1, 'B': 2, 'C': 3}
+    >>> _symbol_table(frozenset("AB")) is _symbol_table(frozenset("BA"))
+    True
+    """
+    return _SymbolTable(symbol_set, others)
 
-    def _subsquare_set(self, r: int, c: int) -> Set[str]:
-        # Return set of symbols in subsquare of SudokuPuzzle self's symbols
-        # where position m occurs.
 
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # length of subsquares
-        ss = round(n ** (1 / 2))
-        # upper-left position of m's subsquare
-        ul_row = (r // ss) * ss
-        ul_col = (c // ss) * ss
+@lru_cache(maxsize=None)
+def _cells(n: int) -> List[Tuple[int, int, int]]:
+    """
+    Return the (row, column, subsquare) of every position of an n x n
+    grid, in row major order.
+
+    >>> _cells(4)[:6]
+    [(0, 0, 0), (0, 1, 0), (0, 2, 1), (0, 3, 1), (1, 0, 0), (1, 1, 0)]
+    """
+    ss = round(n ** (1 / 2))
+    return [(r, c, (r // ss) * ss + c // ss)
+            for r in range(n) for c in range(n)]
 
-        subsquare_symbols = []
-        for i in range(ss):
-            for j in range(ss):
-                subsquare_symbols.append(symbols[ul_row + i][ul_col + j])
-        return set(subsquare_symbols)
+
+@lru_cache(maxsize=None)
+def _units(n: int) -> List[Tuple[int, int, List[Tuple[int, int, int]]]]:
+    """
+    Return the rows, then columns, then subsquares of an n x n grid, as
+    (kind, index, positions) where kind is 0, 1 or 2 respectively and
+    positions lists the unit's (row, column, subsquare) positions.
+
+    >>> len(_units(9)), _units(4)[4]
+    (27, (1, 0, [(0, 0, 0), (1, 0, 0), (2, 0, 2), (3, 0, 2)]))
+    """
+    cells = _cells(n)
+    return [(kind, i, [x for x in cells if x[kind] == i])
+            for kind in range(3) for i in range(n)]
 
 
 if __name__ == "__main__":
@@ -309,16 +805,16 @@ if __name__ == "__main__":
     print("solving sudoku from July 9 2015 Star... \n\n{}\n\n".format(s))
 
     from time import time
-    from puzzle_tools import depth_first_solve
+    from puzzle_tools import depth_first_solve, TimedContext
 
-    start = time()
-    sol = depth_first_solve(s)
+    start, context = time(), TimedContext()
+    sol = depth_first_solve(s, context)
     print(sol)
     while sol.children:
         sol = sol.children[0]
     end = time()
     print("time to solve 9x9 using depth_first: "
-          "{} seconds\n".format(end - start))
+          "{} seconds\n{}\n".format(end - start, context.stats(True)))
     print(sol)
 
     s = SudokuPuzzle(9,
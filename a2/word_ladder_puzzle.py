@@ -12,9 +12,17 @@ This module contains the class required to solve word ladder puzzles.
 """
 
 from __future__ import annotations
-from typing import Set, List
+from typing import Set, List, Dict, Iterator, Union, Optional, \
+    FrozenSet, Iterable
 from puzzle import Puzzle
-import copy
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from mapped_file import MappedFile
+import os
+
+# letters a word may be changed to in one step
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
 
 
 class WordLadderPuzzle(Puzzle):
@@ -27,7 +35,8 @@ class WordLadderPuzzle(Puzzle):
     === Private Attributes ===
     _from_word: the initial word the puzzle begins with
     _to_word: the goal word the puzzle wants to change to
-    _word_set: the set of all words that are possible valid words to change into
+    _word_set: the set of all words that are possible valid words to change into,
+        frozen when the puzzle is made unless it is a CompiledWordSet
     _chars: a string of all possible characters that a word may consist of
 
     === Representation Invariants ===
@@ -39,23 +48,43 @@ class WordLadderPuzzle(Puzzle):
         Create a new word-ladder puzzle with the aim of stepping
         from from_word to to_word using words in ws, changing one
         character at each step.
+
+        Later changes to ws do not affect this puzzle.
         """
 
         _from_word: str
         _to_word: str
-        _word_set: Set[str]
+        _word_set: Union[FrozenSet[str], CompiledWordSet]
         _chars: str
 
+        # frozenset of a frozenset is the same object, so extensions share
+        # the word set of their puzzle for free
+        if not isinstance(ws, CompiledWordSet):
+            ws = frozenset(ws)
         (self._from_word, self._to_word, self._word_set) = (from_word,
                                                             to_word, ws)
         # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
+        self._chars = _LETTERS
 
     def __eq__(self, other):
         return (type(other) == type(self) and
                 self._from_word == other._from_word and
                 self._to_word == other._to_word and
-                self._word_set == other._word_set)
+                (self._word_set is other._word_set or
+                 self._word_set == other._word_set))
+
+    def __hash__(self):
+        return hash(self.state_key())
+
+    def state_key(self) -> str:
+        """
+        Return the current word of this WordLadderPuzzle; the target word
+        and word set are the same for every state of one solve.
+
+        >>> WordLadderPuzzle('cost', 'save', {'cast', 'case'}).state_key()
+        'cost'
+        """
+        return self._from_word
 
     def __str__(self):
         """
@@ -85,42 +114,91 @@ class WordLadderPuzzle(Puzzle):
         cars -> bark
         """
 
-        def find_same_length(j: Set, k: str) -> List:
-            """
-            finds the same length of words in a word set
-            """
-            h = [*j, ]
-            i = []
-            for j in h:
-                if len(j) == len(k):
-                    i.append(j)
-            return i
-
-        list_set = find_same_length(self._word_set, self._from_word)
-        # list_set is a list of the words in the set with the same length as
-        # from_word
+        word = self._from_word
+        if isinstance(self._word_set, CompiledWordSet) and \
+                self._chars == _LETTERS:
+            return [WordLadderPuzzle(found, self._to_word, self._word_set)
+                    for found in self._word_set.neighbours(word)]
+        patterns = _neighbour_index(self._word_set, len(word))
 
         ans = []
-        temp_ans = []
-
-        len_word = len(self._from_word)
-
-        for x in range(len_word):
-            for y in self._chars:
-                temp = copy.deepcopy(self._from_word)
-                if temp[x] != y:
-                    temp = list(temp)
-                    temp[x] = y
-                    temp = "".join(temp)
-                    temp_ans.append(temp)
-
-        for a in temp_ans:
-            for b in list_set:
-                if a == b:
-                    found = WordLadderPuzzle(a, self._to_word, self._word_set)
-                    ans.append(found)
+        for x in range(len(word)):
+            for found in patterns.get(word[:x] + "*" + word[x + 1:], []):
+                if found[x] != word[x] and found[x] in self._chars:
+                    ans.append(WordLadderPuzzle(found, self._to_word,
+                                                self._word_set))
         return ans
 
+    def move_to(self, extension: WordLadderPuzzle) -> str:
+        """
+        Return the word <extension> steps to, which is the code of the
+        move to it.
+
+        >>> x = WordLadderPuzzle('cost', 'case', {'cast', 'case'})
+        >>> x.move_to(x.extensions()[0])
+        'cast'
+        """
+        return extension._from_word
+
+    def apply_move(self, move: str) -> WordLadderPuzzle:
+        """
+        Return the WordLadderPuzzle that steps to the word <move>.
+
+        Raise ValueError if <move> is not an extension's word.
+
+        >>> print(WordLadderPuzzle('cost', 'case', {'cast'}).apply_move('cast'))
+        cast -> case
+        >>> WordLadderPuzzle('cost', 'case', {'case'}).apply_move('case')
+        Traceback (most recent call last):
+        ...
+        ValueError: case is not one letter away from cost
+        """
+        word = self._from_word
+        if move not in self._word_set or len(move) != len(word) or \
+                sum(1 for x, y in zip(move, word) if x != y) != 1 or \
+                any(x not in self._chars for x, y in zip(move, word)
+                    if x != y):
+            raise ValueError("{} is not one letter away from {}".format(
+                move, word))
+        return WordLadderPuzzle(move, self._to_word, self._word_set)
+
+    def goal(self) -> WordLadderPuzzle:
+        """
+        Return the solved WordLadderPuzzle this one is working towards.
+
+        >>> print(WordLadderPuzzle('cost', 'case', {'cast', 'case'}).goal())
+        case -> case
+        """
+        return WordLadderPuzzle(self._to_word, self._to_word, self._word_set)
+
+    def reverse_extensions(self) -> List[WordLadderPuzzle]:
+        """
+        Return list of the WordLadderPuzzles that have this one as an
+        extension.  Changing a letter can be undone, but only words in the
+        word set can be stepped to.
+
+        >>> x = WordLadderPuzzle('bark', 'bark', {'bark', 'dark'})
+        >>> [str(i) for i in x.reverse_extensions()]
+        ['dark -> bark']
+        >>> WordLadderPuzzle('bzrk', 'bark', {'bark'}).reverse_extensions()
+        []
+        """
+        if self._from_word not in self._word_set:
+            return []
+        return self.extensions()
+
+    def heuristic(self) -> int:
+        """
+        Return the number of positions where the current word differs from
+        the target word.  Each step changes one letter, so this never
+        overestimates.
+
+        >>> WordLadderPuzzle('cost', 'case', {'cast', 'case'}).heuristic()
+        2
+        """
+        return sum(1 for x, y in zip(self._from_word, self._to_word)
+                   if x != y) + abs(len(self._from_word) - len(self._to_word))
+
     def is_solved(self) -> bool:
         """
         Return whether word ladder puzzle is solved.
@@ -131,6 +209,223 @@ class WordLadderPuzzle(Puzzle):
             return False
 
 
+@lru_cache(maxsize=16)
+def _neighbour_index(ws: FrozenSet[str],
+                     length: int) -> Dict[str, List[str]]:
+    """
+    Return _pattern_index(ws, length), built once per word set and length
+    and shared by every WordLadderPuzzle with an equal word set.  Word
+    sets are frozen, so the index can never go out of date.
+
+    >>> ws = frozenset({'care', 'cure', 'core', 'cart', 'cares'})
+    >>> _neighbour_index(ws, 4) is _neighbour_index(frozenset(ws), 4)
+    True
+    """
+    return _pattern_index(ws, length)
+
+
+def _pattern_index(ws: Iterable[str], length: int) -> Dict[str, List[str]]:
+    """
+    Return a dictionary mapping each wildcard pattern of the words of
+    <length> in <ws>, i.e. a word with one letter replaced by "*", to the
+    sorted list of those words matching it.
+
+    >>> _pattern_index({'care', 'cure', 'core', 'cart', 'cares'}, 4)['c*re']
+    ['care', 'core', 'cure']
+    """
+    patterns = {}
+    for word in sorted(ws):
+        if len(word) == length:
+            for x in range(length):
+                patterns.setdefault(word[:x] + "*" + word[x + 1:],
+                                    []).append(word)
+    return patterns
+
+
+class CompiledWordSet(MappedFile):
+    """
+    A read-only word set loaded from a file written by compile_word_set,
+    memory-mapped, so memory does not grow with the size of the
+    dictionary.  It can be used anywhere a WordLadderPuzzle expects a set
+    of words.
+
+    File layout, in native byte order: a header of five unsigned 32-bit
+    ints (magic, version, number of words N, number of neighbour entries
+    E, number of distinct word lengths K); K (length, index of first word
+    of that length) pairs; N + 1 offsets into the word bytes; N + 1
+    offsets into the neighbour entries; E neighbour entries, each a word
+    index; and finally the UTF-8 bytes of the words.  Words are sorted by
+    length and then by their bytes, and the neighbours of each word (the
+    words one change of a letter a-z away) are sorted by the position
+    changed and then by letter.
+
+    === Private Attributes ===
+    _starts: the word lengths, ascending
+    _firsts: _firsts[i] is the index of the first word of length _starts[i]
+        (and _firsts[-1] is the number of words)
+    _blob: the position in _map where the bytes of the words start
+    _word_offsets: word i is _map[_blob + _word_offsets[i]:
+        _blob + _word_offsets[i + 1]]
+    _neighbour_offsets: the neighbours of word i are _neighbours[
+        _neighbour_offsets[i]:_neighbour_offsets[i + 1]]
+    _neighbours: the neighbour entries
+    """
+    _starts: List[int]
+    _firsts: List[int]
+    _blob: int
+    _word_offsets: memoryview
+    _neighbour_offsets: memoryview
+    _neighbours: memoryview
+
+    MAGIC = 0x57_4C_44_58
+    VERSION = 1
+    KIND = "compiled word set"
+
+    def __init__(self, path: str) -> None:
+        """
+        Load the compiled word set stored at <path>.
+
+        Raise ValueError if <path> is not a compiled word set.
+        """
+
+        MappedFile.__init__(self, path, 5)
+        n, e, k = self._header[2:5]
+
+        offset = 20
+        lengths = self._view(offset, offset + 8 * k, "I")
+        self._starts = list(lengths[0::2])
+        self._firsts = list(lengths[1::2]) + [n]
+        offset += 8 * k
+        self._word_offsets = self._view(offset, offset + 4 * (n + 1), "I")
+        offset += 4 * (n + 1)
+        self._neighbour_offsets = self._view(offset, offset + 4 * (n + 1),
+                                             "I")
+        offset += 4 * (n + 1)
+        self._neighbours = self._view(offset, offset + 4 * e, "I")
+        self._blob = offset + 4 * e
+
+    def __len__(self) -> int:
+        return self._firsts[-1]
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self._word(i)
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self._index(word) is not None
+
+    def neighbours(self, word: str) -> List[str]:
+        """
+        Return the words of this set that differ from <word> by changing
+        one letter to a letter a-z, sorted by the position changed and
+        then by letter.
+        """
+
+        i = self._index(word)
+        if i is not None:
+            return [self._word(j) for j in self._neighbours[
+                self._neighbour_offsets[i]:self._neighbour_offsets[i + 1]]]
+        ans = []
+        for x in range(len(word)):
+            for letter in _LETTERS:
+                if letter != word[x]:
+                    found = word[:x] + letter + word[x + 1:]
+                    if found in self:
+                        ans.append(found)
+        return ans
+
+    def _word(self, i: int) -> str:
+        # Return the word at index i.
+        return self._map[self._blob + self._word_offsets[i]:
+                         self._blob + self._word_offsets[i + 1]
+                         ].decode("utf-8")
+
+    def _index(self, word: str) -> Optional[int]:
+        # Return the index of word, or None if it is not in this set.
+        k = bisect_right(self._starts, len(word)) - 1
+        if k < 0 or self._starts[k] != len(word):
+            return None
+        target = word.encode("utf-8")
+        lo, hi = self._firsts[k], self._firsts[k + 1]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = self._map[self._blob + self._word_offsets[mid]:
+                              self._blob + self._word_offsets[mid + 1]]
+            if found == target:
+                return mid
+            elif found < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+
+def compile_word_set(words: Set[str], path: str) -> None:
+    """
+    Write <words> to <path> in the format loaded by load_word_set,
+    with the neighbours of every word worked out ahead of time.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "words.wl")
+    >>> compile_word_set({"care", "core", "cure", "cares", "Cure"}, path)
+    >>> ws = load_word_set(path)
+    >>> sorted(ws) == sorted({"care", "core", "cure", "cares", "Cure"})
+    True
+    >>> "core" in ws, "cere" in ws
+    (True, False)
+    >>> ws.neighbours("cure"), ws.neighbours("cere")
+    (['care', 'core'], ['care', 'core', 'cure'])
+    >>> ws.close()
+    """
+    ordered = sorted(set(words), key=lambda w: (len(w), w.encode("utf-8")))
+    index = {word: i for i, word in enumerate(ordered)}
+
+    lengths, word_offsets, blob = array("I"), array("I", [0]), bytearray()
+    neighbour_offsets, neighbours = array("I", [0]), array("I")
+    patterns = {}
+    for i, word in enumerate(ordered):
+        if i == 0 or len(word) != len(ordered[i - 1]):
+            lengths.extend([len(word), i])
+            patterns = _pattern_index((w for w in ordered
+                                       if len(w) == len(word)), len(word))
+        blob += word.encode("utf-8")
+        word_offsets.append(len(blob))
+        for x in range(len(word)):
+            for found in patterns[word[:x] + "*" + word[x + 1:]]:
+                if found[x] != word[x] and found[x] in _LETTERS:
+                    neighbours.append(index[found])
+        neighbour_offsets.append(len(neighbours))
+
+    header = array("I", [CompiledWordSet.MAGIC, CompiledWordSet.VERSION,
+                         len(ordered), len(neighbours), len(lengths) // 2])
+    with open(path, "wb") as f:
+        for section in [header, lengths, word_offsets, neighbour_offsets,
+                        neighbours]:
+            section.tofile(f)
+        f.write(blob)
+
+
+def load_word_set(path: str) -> CompiledWordSet:
+    """
+    Return the compiled word set stored at <path>, memory-mapped.
+
+    If <path> is a plain word list, one or more words per line, as in
+    "words", compile it first to <path> + ".wl", unless that file is
+    already newer than <path>, and load that instead.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == array("I", [CompiledWordSet.MAGIC]).tobytes():
+        return CompiledWordSet(path)
+
+    compiled = path + ".wl"
+    if not os.path.exists(compiled) or \
+            os.path.getmtime(compiled) < os.path.getmtime(path):
+        with open(path, "r", encoding="utf-8") as words:
+            compile_word_set(set(words.read().split()), compiled)
+    return CompiledWordSet(compiled)
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -138,9 +433,13 @@ if __name__ == '__main__':
     # Comment out the code below as you solve necessary parts of the assignment
 
     from puzzle_tools import breadth_first_solve, depth_first_solve
+    from puzzle_tools import bidirectional_solve
     from time import time
-    with open("words", "r") as words:
-        word_set = set(words.read().split())
+    # printing a long depth-first ladder recurses through PuzzleNode.__str__
+    import sys
+    sys.setrecursionlimit(10**6)
+    # compiled to words.wl on the first run, then memory-mapped
+    word_set = load_word_set("words")
     w = WordLadderPuzzle("same", "cost", word_set)
     start = time()
     sol = breadth_first_solve(w)
@@ -149,6 +448,12 @@ if __name__ == '__main__':
     print("...using breadth-first-search")
     print("Solutions: {} took {} seconds.".format(sol, end - start))
     start = time()
+    sol = bidirectional_solve(w)
+    end = time()
+    print("Solving word ladder from same->cost")
+    print("...using bidirectional-breadth-first-search")
+    print("Solutions: {} took {} seconds.".format(sol, end - start))
+    start = time()
     sol = depth_first_solve(w)
     end = time()
     print("Solving word ladder from same->cost")